@@ -0,0 +1,281 @@
+"""
+Per-stage benchmark for the wardrobe upload / tagging pipeline.
+
+Feeds synthetic (or sample) garment images through each stage and reports
+p50/p95 latency, throughput and peak RSS per stage:
+
+    remove_background   rembg + crop + white fill, per image, N threads in parallel
+    preprocess          CLIP preprocess transform, per image
+    encode_image        CLIP image encoder, per batch
+    scoring             LabelScorer matmul + argmax, per batch
+    generate_tags       full in-memory tagging, per image
+    generate_tags_batch batched tagging, per batch
+
+Usage:
+    python -m benchmarks.tagging_benchmark
+    python -m benchmarks.tagging_benchmark --images ./samples --batch-sizes 1,8,32 --threads 1,4
+    python -m benchmarks.tagging_benchmark --stages encode_image,scoring --output bench.json
+
+CLIP stages honour CLIP_BACKEND, so running once per backend compares them.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import torch
+from PIL import Image, ImageDraw
+
+from config import CLIP_MODEL_NAME
+from services.background_removal_service import remove_background_image
+from services.clip_service import (
+    BACKEND_ID, clip_model_manager, encode_images, generate_tags, generate_tags_batch
+)
+
+STAGES = ["remove_background", "preprocess", "encode_image", "scoring", "generate_tags", "generate_tags_batch"]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process, from /proc on Linux, else the lifetime peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler:
+    """Samples RSS on a background thread to find the peak while a stage runs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = current_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+def synthetic_garment(width: int, height: int, seed: int) -> bytes:
+    """A noisy, colored garment-like silhouette on a light background, JPEG encoded."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(200, 256, (height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(background)
+
+    draw = ImageDraw.Draw(image)
+    color = tuple(int(c) for c in rng.integers(0, 200, 3))
+    draw.rectangle((width * 0.3, height * 0.15, width * 0.7, height * 0.85), fill=color)
+    draw.ellipse((width * 0.15, height * 0.15, width * 0.45, height * 0.45), fill=color)
+    draw.ellipse((width * 0.55, height * 0.15, width * 0.85, height * 0.45), fill=color)
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def load_inputs(images_dir: str, count: int, size: tuple) -> list:
+    """Encoded image bytes: files from images_dir, or synthetic garments."""
+    if images_dir:
+        names = sorted(n for n in os.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS))[:count]
+        inputs = []
+        for name in names:
+            with open(os.path.join(images_dir, name), "rb") as f:
+                inputs.append(f.read())
+        return inputs
+
+    return [synthetic_garment(size[0], size[1], seed) for seed in range(count)]
+
+
+def summarize(latencies: list, items_per_call: int, wall_seconds: float, total_items: int, peak_rss: float) -> dict:
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "items_per_call": items_per_call,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "mean_ms": round(float(latencies_ms.mean()), 2),
+        "throughput_items_per_s": round(total_items / wall_seconds, 2),
+        "peak_rss_mb": round(peak_rss, 1)
+    }
+
+
+def run_parallel(fn, inputs: list, threads: int, warmup: int) -> tuple:
+    """Time fn over inputs on a thread pool; returns (per-call latencies, wall seconds)."""
+    for item in inputs[:warmup]:
+        fn(item)
+
+    def timed(item):
+        started = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(timed, inputs))
+    return latencies, time.perf_counter() - started
+
+
+def run_batched(fn, batches: list, warmup: int) -> tuple:
+    """Time fn once per batch, sequentially; returns (per-batch latencies, wall seconds)."""
+    for batch in batches[:warmup]:
+        fn(batch)
+
+    latencies = []
+    started = time.perf_counter()
+    for batch in batches:
+        call_started = time.perf_counter()
+        fn(batch)
+        latencies.append(time.perf_counter() - call_started)
+    return latencies, time.perf_counter() - started
+
+
+def chunk(items: list, size: int) -> list:
+    """Split items into full batches of size, cycling through items if there are too few."""
+    needed = max(len(items), size) // size * size
+    cycled = [items[i % len(items)] for i in range(needed)]
+    return [cycled[i:i + size] for i in range(0, needed, size)]
+
+
+def benchmark(args) -> dict:
+    raw_inputs = load_inputs(args.images, args.count, (args.width, args.height))
+    decoded = [Image.open(BytesIO(data)).convert("RGB") for data in raw_inputs]
+    results = {stage: [] for stage in args.stages}
+
+    if "remove_background" in args.stages:
+        for threads in args.threads:
+            with RssSampler() as rss:
+                latencies, wall = run_parallel(
+                    lambda data: remove_background_image(BytesIO(data)), raw_inputs, threads, args.warmup
+                )
+            results["remove_background"].append(
+                {"threads": threads, **summarize(latencies, 1, wall, len(raw_inputs), rss.peak)}
+            )
+
+    clip_model = clip_model_manager.load()
+    preprocessed = [clip_model.preprocess(image) for image in decoded]
+
+    for threads in args.threads:
+        torch.set_num_threads(threads)
+
+        if "preprocess" in args.stages:
+            with RssSampler() as rss:
+                latencies, wall = run_parallel(clip_model.preprocess, decoded, threads, args.warmup)
+            results["preprocess"].append(
+                {"threads": threads, **summarize(latencies, 1, wall, len(decoded), rss.peak)}
+            )
+
+        if "generate_tags" in args.stages:
+            with RssSampler() as rss:
+                latencies, wall = run_batched(generate_tags, decoded, args.warmup)
+            results["generate_tags"].append(
+                {"threads": threads, **summarize(latencies, 1, wall, len(decoded), rss.peak)}
+            )
+
+        for batch_size in args.batch_sizes:
+            tensor_batches = [torch.stack(batch) for batch in chunk(preprocessed, batch_size)]
+            total = len(tensor_batches) * batch_size
+
+            if "encode_image" in args.stages:
+                with RssSampler() as rss:
+                    latencies, wall = run_batched(encode_images, tensor_batches, args.warmup)
+                results["encode_image"].append(
+                    {"threads": threads, **summarize(latencies, batch_size, wall, total, rss.peak)}
+                )
+
+            if "scoring" in args.stages:
+                feature_batches = [encode_images(batch) for batch in tensor_batches]
+                with RssSampler() as rss:
+                    latencies, wall = run_batched(clip_model.scorer.score, feature_batches, args.warmup)
+                results["scoring"].append(
+                    {"threads": threads, **summarize(latencies, batch_size, wall, total, rss.peak)}
+                )
+
+            if "generate_tags_batch" in args.stages:
+                image_batches = chunk(decoded, batch_size)
+                with RssSampler() as rss:
+                    latencies, wall = run_batched(generate_tags_batch, image_batches, args.warmup)
+                results["generate_tags_batch"].append(
+                    {"threads": threads, **summarize(latencies, batch_size, wall, total, rss.peak)}
+                )
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+            "clip_model": CLIP_MODEL_NAME,
+            "clip_backend": BACKEND_ID,
+            "clip_load_seconds": clip_model.load_seconds
+        },
+        "config": {
+            "images": args.images or "synthetic",
+            "count": len(raw_inputs),
+            "synthetic_size": None if args.images else [args.width, args.height],
+            "batch_sizes": args.batch_sizes,
+            "threads": args.threads,
+            "warmup": args.warmup
+        },
+        "stages": results
+    }
+
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tagging pipeline stage by stage")
+    parser.add_argument("--images", help="Directory of sample garment images (default: synthetic)")
+    parser.add_argument("--count", type=int, default=32, help="Number of images")
+    parser.add_argument("--width", type=int, default=1536, help="Synthetic image width")
+    parser.add_argument("--height", type=int, default=2048, help="Synthetic image height")
+    parser.add_argument("--batch-sizes", type=int_list, default=[1, 8, 32])
+    parser.add_argument("--threads", type=int_list, default=[1, os.cpu_count() or 1])
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--stages", type=lambda v: v.split(","), default=STAGES, help=f"Subset of {','.join(STAGES)}")
+    parser.add_argument("--output", default="bench_output.json", help="JSON results file")
+    args = parser.parse_args()
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    report = benchmark(args)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for stage, rows in report["stages"].items():
+        for row in rows:
+            print(
+                f"{stage:<20} threads={row['threads']:<3} batch={row['items_per_call']:<3} "
+                f"p50={row['p50_ms']:>9.2f}ms p95={row['p95_ms']:>9.2f}ms "
+                f"{row['throughput_items_per_s']:>8.2f} items/s peak_rss={row['peak_rss_mb']:.0f}MB"
+            )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
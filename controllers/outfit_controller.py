@@ -0,0 +1,19 @@
+from fastapi import HTTPException
+from fastapi.responses import RedirectResponse
+
+from services.image_combiner_service import ImageCombinerService
+
+
+def render_outfit_controller(manifest: str):
+    """Render (or reuse) the collage for a signed manifest token and redirect to the image."""
+    try:
+        items, size = ImageCombinerService.decode_manifest_token(manifest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    image_url = ImageCombinerService.combine_outfit_images(items, size)
+    if not image_url:
+        raise HTTPException(status_code=404, detail="Outfit has no items to render")
+
+    # The same manifest always renders to the same image
+    return RedirectResponse(image_url, status_code=302, headers={"Cache-Control": "public, max-age=86400"})
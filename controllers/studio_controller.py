@@ -1,12 +1,11 @@
 import io
-import requests
 from uuid import UUID
 
 from repositories.wardrobe_repository import WardrobeRepository
 from repositories.studio_repository import StudioRepository
 from repositories.user_repository import UserRepository
 from services.studio_image_service import StudioImageService
-from services.s3_service import upload_studio_image
+from services.s3_service import upload_studio_image, read_image_bytes
 
 
 # Category-specific prompts for garment reconstruction
@@ -71,10 +70,8 @@ def generate_studio_image_controller(user_id: str, item_id: str) -> dict:
         print(f"[STUDIO CONTROLLER] Category: {category_group}")
         print(f"[STUDIO CONTROLLER] Original image URL: {image_url}")
 
-        # 2. Download image from Cloudinary
-        response = requests.get(image_url)
-        response.raise_for_status()
-        image_bytes = io.BytesIO(response.content)
+        # 2. Read the original image (directly from MinIO for our own objects)
+        image_bytes = io.BytesIO(read_image_bytes(image_url))
 
         # 3. Choose prompt based on category
         prompt = get_prompt_for_category(category_group)
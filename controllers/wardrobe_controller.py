@@ -1,61 +1,71 @@
+from typing import List
 from uuid import UUID
 from fastapi import UploadFile
 
-from services.s3_service import upload_image, delete_image
-from services.clip_service import generate_tags
+from config import UPLOAD_BATCH_MAX_FILES
+
+from services.s3_service import delete_image
 from services.wardrobe_tags_service import WardrobeTagsService
-from services.background_removal_service import remove_background
-from services.qdrant_service import store_embedding, delete_embedding
+from services.wardrobe_upload_service import WardrobeUploadService
+from services.qdrant_service import delete_embedding
 from dependencies.auth import CurrentUser
 from repositories.wardrobe_repository import WardrobeRepository
 from repositories.studio_repository import StudioRepository
+from repositories.upload_job_repository import UploadJobRepository
 
 
 def upload_wardrobe_item(file: UploadFile, user: CurrentUser):
-    # Remove background and add white background
-    processed_image = remove_background(file.file)
-
-    # Upload processed image to Cloudinary
-    image_url = upload_image(processed_image)
-    tags = generate_tags(image_url)
-
-    # Save to database
-    item = WardrobeRepository.create(
-        user_id=UUID(user.id),
-        image_url=image_url,
-        category_group=tags["categoryGroup"],
-        category=tags["category"],
-        attributes=tags["attributes"]
-    )
+    # Store the raw upload and hand it to the background pipeline
+    job = WardrobeUploadService.submit(UUID(user.id), file.file)
 
-    # Update the wardrobe tags tree with item ID
-    WardrobeTagsService.add_item_to_tag(
-        user_id=UUID(user.id),
-        category_group=tags["categoryGroup"],
-        category=tags["category"],
-        item_id=str(item["id"])
-    )
+    return {
+        "success": True,
+        "user_id": str(user.id),
+        "job_id": str(job["id"]),
+        "item_id": str(job["id"]),
+        "status": job["status"],
+        "status_url": f"/wardrobe/jobs/{job['id']}"
+    }
+
+def upload_wardrobe_items_batch(files: List[UploadFile], user: CurrentUser):
+    if len(files) > UPLOAD_BATCH_MAX_FILES:
+        return {"success": False, "message": f"At most {UPLOAD_BATCH_MAX_FILES} files per batch"}
 
-    # Store embedding in Qdrant for similarity search
-    store_embedding(
-        item_id=str(item["id"]),
-        user_id=str(user.id),
-        embedding=tags["embedding"],
-        category_group=tags["categoryGroup"],
-        category=tags["category"],
-        attributes=tags["attributes"],
-        image_url=image_url
+    results = WardrobeUploadService.upload_batch(
+        UUID(user.id),
+        [(file.filename, file.file) for file in files]
     )
+    uploaded = sum(1 for result in results if result["success"])
 
     return {
-        "success": True,
+        "success": uploaded > 0,
         "user_id": str(user.id),
-        "item": {
-            "id": str(item["id"]),
-            "image_url": item["image_url"],
-            "categoryGroup": item["category_group"],
-            "category": item["category"],
-            "attributes": item["attributes"]
+        "count": uploaded,
+        "failed": len(results) - uploaded,
+        "results": results
+    }
+
+def get_upload_job(job_id: str, user: CurrentUser):
+    try:
+        job = UploadJobRepository.get_by_id(UUID(job_id), UUID(user.id))
+    except ValueError:
+        job = None
+
+    if not job:
+        return {"success": False, "message": "Job not found or not authorized"}
+
+    return {
+        "success": True,
+        "job": {
+            "id": str(job["id"]),
+            "item_id": str(job["id"]),
+            "status": job["status"],
+            "stage": job["stage"],
+            "stages": job["stages"],
+            "error": job["error"],
+            "item": job["item"],
+            "created_at": job["created_at"].isoformat(),
+            "updated_at": job["updated_at"].isoformat()
         }
     }
 
@@ -101,6 +111,14 @@ def delete_wardrobe_item(item_id: str, user: CurrentUser):
 
     image_url = item.get("image_url")
 
+    # Remove embedding from Qdrant first, so a failed or timed-out Qdrant write
+    # leaves the item intact instead of an orphaned point
+    try:
+        delete_embedding(item_id)
+    except Exception as e:
+        print(f"Failed to delete embedding for {item_id}: {e}")
+        return {"success": False, "message": "Failed to delete item"}
+
     # Delete studio images first (get URLs before deleting from DB)
     studio_image_urls = StudioRepository.delete_by_item_id(UUID(user.id), UUID(item_id))
 
@@ -121,7 +139,4 @@ def delete_wardrobe_item(item_id: str, user: CurrentUser):
     # Remove item from wardrobe tags tree
     WardrobeTagsService.remove_item(UUID(user.id), item_id)
 
-    # Remove embedding from Qdrant
-    delete_embedding(item_id)
-
     return {"success": True, "message": "Item deleted"}
@@ -68,6 +68,30 @@ def init_db():
         CREATE INDEX IF NOT EXISTS idx_wardrobe_items_user_id ON wardrobe_items(user_id)
     """)
 
+    # Create wardrobe_upload_jobs table - tracks background processing of uploads.
+    # The job id becomes the wardrobe item id once processing completes
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS wardrobe_upload_jobs (
+            id UUID PRIMARY KEY,
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            stage VARCHAR(50),
+            stages JSONB DEFAULT '{}',
+            error TEXT,
+            item JSONB,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    """)
+
+    # Create index on user_id and status for wardrobe_upload_jobs
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_wardrobe_upload_jobs_user_id ON wardrobe_upload_jobs(user_id)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_wardrobe_upload_jobs_status ON wardrobe_upload_jobs(status)
+    """)
+
     # Create saved_images table
     cur.execute("""
         CREATE TABLE IF NOT EXISTS saved_images (
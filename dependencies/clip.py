@@ -0,0 +1,15 @@
+from fastapi import HTTPException
+
+from config import CLIP_READY_TIMEOUT
+from services.inference_client import wait_until_ready, ClipModelNotReadyError
+
+
+def require_clip_model():
+    """
+    Wait for the CLIP model to finish loading before running the endpoint.
+    Rejects with 503 (and Retry-After) if it is not ready within CLIP_READY_TIMEOUT.
+    """
+    try:
+        wait_until_ready(timeout=CLIP_READY_TIMEOUT)
+    except ClipModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
@@ -0,0 +1,122 @@
+"""
+Local inference server holding the only copy of CLIP (and rembg).
+
+API workers reach it through services/inference_client.py when
+INFERENCE_SERVER_URL is set. Concurrent tagging and text-embedding requests
+are gathered into micro-batches (INFERENCE_MAX_BATCH_SIZE items or
+INFERENCE_MAX_WAIT_MS, whichever comes first) and run as one batched
+encode_image / encode_text call.
+
+Run:
+    uvicorn inference_server:app --host 127.0.0.1 --port 8001
+"""
+import asyncio
+from io import BytesIO
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+from pydantic import BaseModel
+
+from config import INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, INFERENCE_REMBG_CONCURRENCY
+from services.clip_service import clip_model_manager, generate_tags_batch, get_text_embeddings
+from services.background_removal_service import remove_background_image
+from services.inference_client import ClipModelNotReadyError
+from services.micro_batcher import MicroBatcher
+
+app = FastAPI(title="WearWhat Inference")
+
+# A cold model fails a whole batch at once rather than being retried item by item
+tag_batcher = MicroBatcher(
+    generate_tags_batch, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, name="tags",
+    batch_errors=(ClipModelNotReadyError,)
+)
+text_batcher = MicroBatcher(
+    get_text_embeddings, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, name="text",
+    batch_errors=(ClipModelNotReadyError,)
+)
+
+# rembg does not batch; bound how many segmentations run at once instead
+# (defaults to REMBG_POOL_SIZE, one slot per session)
+rembg_slots = asyncio.Semaphore(INFERENCE_REMBG_CONCURRENCY)
+
+
+class TagUrlRequest(BaseModel):
+    image_url: str
+
+
+class TextEmbeddingRequest(BaseModel):
+    text: str
+
+
+@app.on_event("startup")
+def load_clip_model():
+    clip_model_manager.start()
+
+
+async def _run_batched(batcher: MicroBatcher, item):
+    # Reject while CLIP is cold instead of parking the batcher thread on the load
+    if not clip_model_manager.is_ready():
+        clip_model_manager.start()  # No-op while loading; retries a failed load
+        raise HTTPException(
+            status_code=503, detail="CLIP model is still loading, please retry shortly", headers={"Retry-After": "5"}
+        )
+
+    try:
+        return await asyncio.wrap_future(batcher.submit(item))
+    except ClipModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/health")
+def health():
+    return {
+        "success": True,
+        "clip_model": clip_model_manager.status(),
+        "batchers": {
+            "tags": tag_batcher.stats(),
+            "text": text_batcher.stats()
+        }
+    }
+
+
+@app.post("/tag")
+async def tag_image(request: Request):
+    """
+    Tag one image. Body is either raw RGB pixels (X-Image-Format: raw,
+    X-Image-Size: WxH) or an encoded image file (X-Image-Format: encoded).
+    """
+    body = await request.body()
+
+    if request.headers.get("X-Image-Format") == "raw":
+        width, height = (int(v) for v in request.headers["X-Image-Size"].split("x"))
+        image = Image.frombytes("RGB", (width, height), body)
+    else:
+        image = body
+
+    return await _run_batched(tag_batcher, image)
+
+
+@app.post("/tag/url")
+async def tag_image_url(request: TagUrlRequest):
+    return await _run_batched(tag_batcher, request.image_url)
+
+
+@app.post("/embed/text")
+async def embed_text(request: TextEmbeddingRequest):
+    return {"embedding": await _run_batched(text_batcher, request.text)}
+
+
+@app.post("/remove-background")
+async def remove_background(request: Request):
+    """Returns the processed image as raw RGB pixels with an X-Image-Size header."""
+    body = await request.body()
+
+    async with rembg_slots:
+        image = await run_in_threadpool(remove_background_image, BytesIO(body))
+
+    return Response(
+        content=image.tobytes(),
+        media_type="application/octet-stream",
+        headers={"X-Image-Size": f"{image.width}x{image.height}"}
+    )
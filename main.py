@@ -1,8 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import wardrobe, auth, wardrobe_tags, recommendation, calendar_outfit, chat, post, studio
+from routers import wardrobe, auth, wardrobe_tags, recommendation, calendar_outfit, chat, post, studio, health, outfits
 from db import init_db
 from services.qdrant_service import init_collection
+from services.inference_client import start_local_model
+from services.wardrobe_upload_service import WardrobeUploadService
+from services.image_combiner_service import check_manifest_config
+
+# Fail fast on an unusable COMBINER_MODE=manifest setup
+check_manifest_config()
 
 # Create tables
 init_db()
@@ -12,6 +18,20 @@ init_collection()
 
 app = FastAPI()
 
+
+@app.on_event("startup")
+def load_clip_model():
+    # Load CLIP in the background so the port binds immediately;
+    # CLIP endpoints wait until it is warm. No-op when using the inference server.
+    start_local_model()
+
+
+@app.on_event("startup")
+def resume_upload_jobs():
+    # Pick up uploads that were accepted but not processed before a restart
+    WardrobeUploadService.resume_pending()
+
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -34,3 +54,5 @@ app.include_router(calendar_outfit.router)
 app.include_router(chat.router)
 app.include_router(post.router)
 app.include_router(studio.router)
+app.include_router(health.router)
+app.include_router(outfits.router)
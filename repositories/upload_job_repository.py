@@ -0,0 +1,200 @@
+from typing import List, Optional
+from uuid import UUID
+import json
+from db import get_connection
+
+# Structure: stages = {
+#   "remove_background": {"status": "completed", "started_at": "...", "finished_at": "...", "duration_ms": 812},
+#   "upload_image": {"status": "running", "started_at": "..."},
+#   "generate_tags": {"status": "pending"}
+# }
+
+class UploadJobRepository:
+
+    @staticmethod
+    def create(job_id: UUID, user_id: UUID, stages: dict) -> dict:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            INSERT INTO wardrobe_upload_jobs (id, user_id, status, stages)
+            VALUES (%s, %s, 'pending', %s)
+            RETURNING *
+            """,
+            (str(job_id), str(user_id), json.dumps(stages))
+        )
+        job = dict(cur.fetchone())
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        return job
+
+    @staticmethod
+    def get_by_id(job_id: UUID, user_id: UUID) -> Optional[dict]:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            "SELECT * FROM wardrobe_upload_jobs WHERE id = %s AND user_id = %s",
+            (str(job_id), str(user_id))
+        )
+        job = cur.fetchone()
+
+        cur.close()
+        conn.close()
+        return dict(job) if job else None
+
+    @staticmethod
+    def claim(job_id: UUID) -> Optional[dict]:
+        """Move a pending job to processing. Returns None if another worker already claimed it."""
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            UPDATE wardrobe_upload_jobs
+            SET status = 'processing', updated_at = NOW()
+            WHERE id = %s AND status = 'pending'
+            RETURNING *
+            """,
+            (str(job_id),)
+        )
+        job = cur.fetchone()
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        return dict(job) if job else None
+
+    @staticmethod
+    def update_stage(job_id: UUID, stage: str, stage_state: dict):
+        """Record one stage's progress and make it the job's current stage."""
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            UPDATE wardrobe_upload_jobs
+            SET stage = %s, stages = jsonb_set(stages, ARRAY[%s], %s::jsonb), updated_at = NOW()
+            WHERE id = %s
+            """,
+            (stage, stage, json.dumps(stage_state), str(job_id))
+        )
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    @staticmethod
+    def complete(job_id: UUID, item: dict):
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            UPDATE wardrobe_upload_jobs
+            SET status = 'completed', stage = NULL, item = %s, updated_at = NOW()
+            WHERE id = %s
+            """,
+            (json.dumps(item), str(job_id))
+        )
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    @staticmethod
+    def fail(job_id: UUID, error: str):
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            UPDATE wardrobe_upload_jobs
+            SET status = 'failed', error = %s, updated_at = NOW()
+            WHERE id = %s
+            """,
+            (error, str(job_id))
+        )
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    @staticmethod
+    def get_stale_processing_ids(stale_after_seconds: int) -> List[str]:
+        """Processing jobs not updated within stale_after_seconds (their worker died)."""
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            SELECT id FROM wardrobe_upload_jobs
+            WHERE status = 'processing' AND updated_at < NOW() - make_interval(secs => %s)
+            ORDER BY created_at
+            """,
+            (stale_after_seconds,)
+        )
+        rows = cur.fetchall()
+
+        cur.close()
+        conn.close()
+        return [str(row["id"]) for row in rows]
+
+    @staticmethod
+    def requeue_stale(job_id: UUID, stale_after_seconds: int) -> bool:
+        """Move a stale processing job back to pending. False if it was updated meanwhile."""
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            UPDATE wardrobe_upload_jobs
+            SET status = 'pending', stage = NULL, updated_at = NOW()
+            WHERE id = %s AND status = 'processing' AND updated_at < NOW() - make_interval(secs => %s)
+            RETURNING id
+            """,
+            (str(job_id), stale_after_seconds)
+        )
+        requeued = cur.fetchone() is not None
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        return requeued
+
+    @staticmethod
+    def fail_stale(job_id: UUID, stale_after_seconds: int, error: str) -> bool:
+        """Fail a stale processing job. False if it was updated meanwhile."""
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            UPDATE wardrobe_upload_jobs
+            SET status = 'failed', error = %s, updated_at = NOW()
+            WHERE id = %s AND status = 'processing' AND updated_at < NOW() - make_interval(secs => %s)
+            RETURNING id
+            """,
+            (error, str(job_id), stale_after_seconds)
+        )
+        failed = cur.fetchone() is not None
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        return failed
+
+    @staticmethod
+    def get_pending_ids() -> List[str]:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute("SELECT id FROM wardrobe_upload_jobs WHERE status = 'pending' ORDER BY created_at")
+        rows = cur.fetchall()
+
+        cur.close()
+        conn.close()
+        return [str(row["id"]) for row in rows]
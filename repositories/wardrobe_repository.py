@@ -1,22 +1,24 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 import json
+from psycopg2.extras import execute_values
 from db import get_connection
 
 class WardrobeRepository:
 
     @staticmethod
-    def create(user_id: UUID, image_url: str, category_group: str, category: str, attributes: dict) -> dict:
+    def create(user_id: UUID, image_url: str, category_group: str, category: str, attributes: dict,
+               item_id: Optional[UUID] = None) -> dict:
         conn = get_connection()
         cur = conn.cursor()
 
         cur.execute(
             """
-            INSERT INTO wardrobe_items (user_id, image_url, category_group, category, attributes)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO wardrobe_items (id, user_id, image_url, category_group, category, attributes)
+            VALUES (COALESCE(%s::uuid, gen_random_uuid()), %s, %s, %s, %s, %s)
             RETURNING id, user_id, image_url, category_group, category, attributes, created_at
             """,
-            (str(user_id), image_url, category_group, category, json.dumps(attributes))
+            (str(item_id) if item_id else None, str(user_id), image_url, category_group, category, json.dumps(attributes))
         )
         item = dict(cur.fetchone())
 
@@ -25,6 +27,41 @@ class WardrobeRepository:
         conn.close()
         return item
 
+    @staticmethod
+    def bulk_create(user_id: UUID, items: List[dict]) -> List[dict]:
+        """
+        Insert many items for one user in one statement.
+        items: [{"id", "image_url", "category_group", "category", "attributes"}]. Returns the rows in input order.
+        """
+        if not items:
+            return []
+
+        conn = get_connection()
+        cur = conn.cursor()
+
+        created = execute_values(
+            cur,
+            """
+            INSERT INTO wardrobe_items (id, user_id, image_url, category_group, category, attributes)
+            VALUES %s
+            RETURNING id, user_id, image_url, category_group, category, attributes, created_at
+            """,
+            [
+                (str(item["id"]), str(user_id), item["image_url"], item["category_group"],
+                 item["category"], json.dumps(item["attributes"]))
+                for item in items
+            ],
+            template="(%s::uuid, %s::uuid, %s, %s, %s, %s::jsonb)",
+            fetch=True
+        )
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        by_id = {str(row["id"]): dict(row) for row in created}
+        return [by_id[str(item["id"])] for item in items]
+
     @staticmethod
     def get_by_id(item_id: UUID) -> Optional[dict]:
         conn = get_connection()
@@ -40,6 +77,30 @@ class WardrobeRepository:
         conn.close()
         return dict(item) if item else None
 
+    @staticmethod
+    def get_by_ids(item_ids: List[UUID], user_id: UUID) -> Dict[str, dict]:
+        """
+        Fetch many of a user's items in one query. Returns {id: item} in the
+        order of item_ids; ids that are missing or belong to another user are left out.
+        """
+        if not item_ids:
+            return {}
+
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            "SELECT * FROM wardrobe_items WHERE id = ANY(%s::uuid[]) AND user_id = %s",
+            ([str(item_id) for item_id in item_ids], str(user_id))
+        )
+        rows = cur.fetchall()
+
+        cur.close()
+        conn.close()
+
+        by_id = {str(row["id"]): dict(row) for row in rows}
+        return {str(item_id): by_id[str(item_id)] for item_id in item_ids if str(item_id) in by_id}
+
     @staticmethod
     def get_by_user_id(user_id: UUID) -> List[dict]:
         conn = get_connection()
@@ -71,6 +132,62 @@ class WardrobeRepository:
         conn.close()
         return deleted is not None
 
+    @staticmethod
+    def bulk_delete(item_ids: List[UUID], user_id: UUID) -> int:
+        """Delete many of a user's items in one statement. Returns the number deleted."""
+        if not item_ids:
+            return 0
+
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            "DELETE FROM wardrobe_items WHERE id = ANY(%s::uuid[]) AND user_id = %s",
+            ([str(item_id) for item_id in item_ids], str(user_id))
+        )
+        deleted = cur.rowcount
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        return deleted
+
+    @staticmethod
+    def bulk_update_tags(items: List[dict]) -> List[dict]:
+        """
+        Update category_group, category and attributes for many items in one statement.
+        items: [{"id", "category_group", "category", "attributes"}]. Returns the updated rows.
+        """
+        if not items:
+            return []
+
+        conn = get_connection()
+        cur = conn.cursor()
+
+        updated = execute_values(
+            cur,
+            """
+            UPDATE wardrobe_items AS w
+            SET category_group = v.category_group,
+                category = v.category,
+                attributes = v.attributes::jsonb,
+                updated_at = NOW()
+            FROM (VALUES %s) AS v (id, category_group, category, attributes)
+            WHERE w.id = v.id::uuid
+            RETURNING w.id, w.user_id, w.image_url, w.category_group, w.category, w.attributes
+            """,
+            [
+                (str(item["id"]), item["category_group"], item["category"], json.dumps(item["attributes"]))
+                for item in items
+            ],
+            fetch=True
+        )
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        return [dict(item) for item in updated]
+
     @staticmethod
     def update_image(item_id: UUID, user_id: UUID, image_url: str) -> Optional[dict]:
         """Update the image_url of a wardrobe item."""
@@ -1,7 +1,8 @@
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List
 from uuid import UUID
 from db import get_connection
 import json
+from psycopg2.extras import execute_values
 
 # Structure: tags_by_category = {
 #   "topwear": {
@@ -71,104 +72,181 @@ class WardrobeTagsRepository:
         return dict(item) if item else None
 
     @staticmethod
-    def add_item_to_tag(user_id: UUID, category_group: str, category: str, item_id: str) -> dict:
-        """Add an item ID to a tag. Creates the record/category/tag if they don't exist."""
-        existing = WardrobeTagsRepository.get_by_user(user_id)
-
-        if existing is None:
-            # Create new record
-            tags_by_category = {category_group: {category: [item_id]}}
-            return WardrobeTagsRepository.create(user_id, tags_by_category)
+    def _modify_locked(user_id: UUID, modify: Callable[[Dict], bool], create: bool) -> Optional[dict]:
+        """
+        Read-modify-write the user's tags tree in one transaction with the row
+        locked (SELECT ... FOR UPDATE), so concurrent uploads and deletes for the
+        same user cannot overwrite each other's changes. modify mutates the tree
+        and returns whether it changed. With create, a missing row is created first.
+        """
+        conn = get_connection()
+        cur = conn.cursor()
 
-        tags_by_category = existing['tags_by_category'] or {}
+        try:
+            if create:
+                cur.execute(
+                    "INSERT INTO wardrobe_tags (user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING",
+                    (str(user_id),)
+                )
 
-        # Ensure category_group exists
-        if category_group not in tags_by_category:
-            tags_by_category[category_group] = {}
+            cur.execute(
+                """
+                SELECT id, user_id, tags_by_category, created_at, updated_at
+                FROM wardrobe_tags
+                WHERE user_id = %s
+                FOR UPDATE
+                """,
+                (str(user_id),)
+            )
+            item = cur.fetchone()
 
-        # Ensure category exists under category_group
-        if category not in tags_by_category[category_group]:
-            tags_by_category[category_group][category] = []
+            if item is not None:
+                item = dict(item)
+                tags_by_category = item['tags_by_category'] or {}
 
-        # Add item_id if not already present
-        if item_id not in tags_by_category[category_group][category]:
-            tags_by_category[category_group][category].append(item_id)
-            return WardrobeTagsRepository.update(user_id, tags_by_category)
+                if modify(tags_by_category):
+                    cur.execute(
+                        """
+                        UPDATE wardrobe_tags
+                        SET tags_by_category = %s, updated_at = NOW()
+                        WHERE user_id = %s
+                        RETURNING id, user_id, tags_by_category, created_at, updated_at
+                        """,
+                        (json.dumps(tags_by_category), str(user_id))
+                    )
+                    item = dict(cur.fetchone())
 
-        return existing
+            conn.commit()
+            return item
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
 
     @staticmethod
-    def remove_item_from_tag(user_id: UUID, category_group: str, category: str, item_id: str) -> Optional[dict]:
-        """Remove an item ID from a tag. Cleans up empty categories/groups."""
-        existing = WardrobeTagsRepository.get_by_user(user_id)
+    def add_item_to_tag(user_id: UUID, category_group: str, category: str, item_id: str) -> dict:
+        """Add an item ID to a tag. Creates the record/category/tag if they don't exist."""
+        def modify(tags_by_category: Dict) -> bool:
+            # Ensure category_group and category exist
+            item_ids = tags_by_category.setdefault(category_group, {}).setdefault(category, [])
 
-        if existing is None:
-            return None
+            # Add item_id if not already present
+            if item_id in item_ids:
+                return False
+            item_ids.append(item_id)
+            return True
 
-        tags_by_category = existing['tags_by_category'] or {}
+        return WardrobeTagsRepository._modify_locked(user_id, modify, create=True)
 
-        # Check if path exists
-        if category_group not in tags_by_category:
-            return existing
-        if category not in tags_by_category[category_group]:
-            return existing
+    @staticmethod
+    def add_items_to_tags(user_id: UUID, items: List[dict]) -> dict:
+        """
+        Add many items to the tags tree with one locked read and one write.
+        items: [{"category_group", "category", "item_id"}].
+        """
+        def modify(tags_by_category: Dict) -> bool:
+            modified = False
+            for item in items:
+                item_ids = tags_by_category.setdefault(item["category_group"], {}).setdefault(item["category"], [])
+                if item["item_id"] not in item_ids:
+                    item_ids.append(item["item_id"])
+                    modified = True
+            return modified
 
-        # Remove item_id if present
-        if item_id in tags_by_category[category_group][category]:
-            tags_by_category[category_group][category].remove(item_id)
+        return WardrobeTagsRepository._modify_locked(user_id, modify, create=True)
+
+    @staticmethod
+    def remove_item_from_tag(user_id: UUID, category_group: str, category: str, item_id: str) -> Optional[dict]:
+        """Remove an item ID from a tag. Cleans up empty categories/groups."""
+        def modify(tags_by_category: Dict) -> bool:
+            # Check if path exists
+            item_ids = tags_by_category.get(category_group, {}).get(category)
+            if not item_ids or item_id not in item_ids:
+                return False
+
+            item_ids.remove(item_id)
 
             # If category is now empty, remove it
-            if not tags_by_category[category_group][category]:
+            if not item_ids:
                 del tags_by_category[category_group][category]
 
                 # If category_group is now empty, remove it
                 if not tags_by_category[category_group]:
                     del tags_by_category[category_group]
+            return True
 
-            return WardrobeTagsRepository.update(user_id, tags_by_category)
-
-        return existing
+        return WardrobeTagsRepository._modify_locked(user_id, modify, create=False)
 
     @staticmethod
     def remove_item_from_all(user_id: UUID, item_id: str) -> Optional[dict]:
         """Remove an item ID from all tags. Used when deleting a wardrobe item."""
-        existing = WardrobeTagsRepository.get_by_user(user_id)
+        def modify(tags_by_category: Dict) -> bool:
+            modified = False
 
-        if existing is None:
-            return None
+            for category_group in list(tags_by_category):
+                categories = tags_by_category[category_group]
+                for category in list(categories):
+                    if item_id in categories[category]:
+                        categories[category].remove(item_id)
+                        modified = True
 
-        tags_by_category = existing['tags_by_category'] or {}
-        modified = False
+                        # Delete empty category
+                        if not categories[category]:
+                            del categories[category]
 
-        # Iterate through all category_groups and categories
-        groups_to_delete = []
-        for category_group in tags_by_category:
-            categories_to_delete = []
-            for category in tags_by_category[category_group]:
-                if item_id in tags_by_category[category_group][category]:
-                    tags_by_category[category_group][category].remove(item_id)
-                    modified = True
+                # Delete empty category_group
+                if not categories:
+                    del tags_by_category[category_group]
 
-                    # Mark empty category for deletion
-                    if not tags_by_category[category_group][category]:
-                        categories_to_delete.append(category)
+            return modified
 
-            # Delete empty categories
-            for category in categories_to_delete:
-                del tags_by_category[category_group][category]
+        return WardrobeTagsRepository._modify_locked(user_id, modify, create=False)
 
-            # Mark empty category_group for deletion
-            if not tags_by_category[category_group]:
-                groups_to_delete.append(category_group)
+    @staticmethod
+    def rebuild_for_users(user_ids: List[str]) -> int:
+        """
+        Rebuild the tags tree of each user from wardrobe_items in one query and
+        one upsert. Used after bulk re-tagging. Returns the number of trees written.
+        """
+        if not user_ids:
+            return 0
 
-        # Delete empty category_groups
-        for group in groups_to_delete:
-            del tags_by_category[group]
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT user_id, category_group, category, array_agg(id::text ORDER BY created_at) AS item_ids
+            FROM wardrobe_items
+            WHERE user_id = ANY(%s::uuid[])
+            GROUP BY user_id, category_group, category
+            """,
+            ([str(user_id) for user_id in user_ids],)
+        )
 
-        if modified:
-            return WardrobeTagsRepository.update(user_id, tags_by_category)
+        trees = {str(user_id): {} for user_id in user_ids}
+        for row in cur.fetchall():
+            tree = trees[str(row["user_id"])]
+            tree.setdefault(row["category_group"], {})[row["category"]] = row["item_ids"]
 
-        return existing
+        execute_values(
+            cur,
+            """
+            INSERT INTO wardrobe_tags (user_id, tags_by_category)
+            VALUES %s
+            ON CONFLICT (user_id) DO UPDATE SET
+                tags_by_category = EXCLUDED.tags_by_category,
+                updated_at = NOW()
+            """,
+            [(user_id, json.dumps(tree)) for user_id, tree in trees.items()],
+            template="(%s::uuid, %s::jsonb)"
+        )
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        return len(trees)
 
     @staticmethod
     def delete(user_id: UUID) -> bool:
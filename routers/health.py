@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from services import inference_client
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"]
+)
+
+
+@router.get("")
+def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"success": True, "status": "ok"}
+
+
+@router.get("/ready")
+def readiness():
+    """
+    Readiness probe: the API can take traffic as soon as it binds.
+    CLIP-backed endpoints wait for (or reject against) the model separately,
+    so the model state is reported here as warm/cold without failing the probe.
+    """
+    clip_status = inference_client.status()
+    return {
+        "success": True,
+        "status": "ready",
+        "clip": "warm" if clip_status["warm"] else "cold",
+        "clip_model": clip_status
+    }
+
+
+@router.get("/clip")
+def clip_readiness():
+    """Returns 200 once the CLIP model is warm, 503 while it is cold or loading."""
+    clip_status = inference_client.status()
+    return JSONResponse(
+        status_code=200 if clip_status["warm"] else 503,
+        content={"success": clip_status["warm"], "clip_model": clip_status}
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Query
+
+from controllers.outfit_controller import render_outfit_controller
+
+router = APIRouter(
+    prefix="/outfits",
+    tags=["Outfits"]
+)
+
+
+@router.get("/render")
+def render_outfit(manifest: str = Query(..., description="Signed manifest token from outfit_manifest.render_url")):
+    """
+    Render an outfit collage on demand. Public (signed tokens only), so the
+    render_url can be used directly as an <img> src.
+    """
+    return render_outfit_controller(manifest)
@@ -3,10 +3,11 @@ from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 
 from dependencies.auth import get_current_user, CurrentUser
+from dependencies.clip import require_clip_model
 from models.recommendation import RecommendationRequest
 from controllers.recommendation_controller import get_recommendation_controller
-from services.qdrant_service import search_similar, search_by_text, get_items_by_tag, get_qdrant_client, COLLECTION_NAME
-from services.clip_service import get_text_embedding
+from services.qdrant_service import search_similar_to_item, search_by_text, get_items_by_tag, get_qdrant_client, COLLECTION_NAME
+from services.inference_client import get_text_embedding
 from services.styling_service import StylingService
 
 
@@ -48,7 +49,7 @@ class StyleOutfitRequest(BaseModel):
     item_id: str
 
 
-@router.post("/search")
+@router.post("/search", dependencies=[Depends(require_clip_model)])
 def search_by_text_prompt(
     request: TextSearchRequest,
     user: CurrentUser = Depends(get_current_user)
@@ -112,31 +113,19 @@ def find_similar_items(
     Find similar items to a given wardrobe item.
     Useful for outfit recommendations.
     """
-    client = get_qdrant_client()
-
-    points = client.retrieve(
-        collection_name=COLLECTION_NAME,
-        ids=[request.item_id],
-        with_vectors=True
-    )
-
-    if not points:
-        return {"success": False, "message": "Item not found"}
-
-    source_embedding = points[0].vector
-
-    results = search_similar(
+    # Qdrant resolves the source item's vector and leaves the item out itself
+    results = search_similar_to_item(
         user_id=str(user.id),
-        query_embedding=source_embedding,
+        item_id=request.item_id,
         category_group=request.category_group,
         color=request.color,
         occasion=request.occasion,
         season=request.season,
-        limit=request.limit + 1
+        limit=request.limit
     )
 
-    # Exclude the source item from results
-    results = [r for r in results if r["item_id"] != request.item_id][:request.limit]
+    if results is None:
+        return {"success": False, "message": "Item not found"}
 
     return {
         "success": True,
@@ -1,19 +1,34 @@
+from typing import List
 from fastapi import APIRouter, UploadFile, File, Depends
-from controllers.wardrobe_controller import upload_wardrobe_item, get_user_wardrobe, delete_wardrobe_item
+from controllers.wardrobe_controller import (
+    upload_wardrobe_item, upload_wardrobe_items_batch, get_upload_job, get_user_wardrobe, delete_wardrobe_item
+)
 from dependencies.auth import get_current_user, CurrentUser
+from dependencies.clip import require_clip_model
 
 router = APIRouter(
     prefix="/wardrobe",
     tags=["Wardrobe"]
 )
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 def upload_image(
     file: UploadFile = File(...),
     user: CurrentUser = Depends(get_current_user)
 ):
     return upload_wardrobe_item(file, user)
 
+@router.post("/upload-batch", dependencies=[Depends(require_clip_model)])
+def upload_images_batch(
+    files: List[UploadFile] = File(...),
+    user: CurrentUser = Depends(get_current_user)
+):
+    return upload_wardrobe_items_batch(files, user)
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, user: CurrentUser = Depends(get_current_user)):
+    return get_upload_job(job_id, user)
+
 @router.get("/")
 def get_wardrobe(user: CurrentUser = Depends(get_current_user)):
     return get_user_wardrobe(user)
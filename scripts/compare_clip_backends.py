@@ -0,0 +1,126 @@
+"""
+Compare CLIP tagging between the PyTorch model and the ONNX Runtime backend.
+
+Exports the ONNX encoders if needed, tags the same images with both backends
+(each with its own encoded label matrices) and reports per-field tag
+agreement, embedding cosine similarity and per-image latency.
+
+Usage:
+    python -m scripts.compare_clip_backends --images ./samples
+    python -m scripts.compare_clip_backends --images ./samples --fp32 --output report.json
+
+Without --images, random synthetic images are used (agreement on noise is
+only a smoke test; use real garment photos for a meaningful number).
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+import clip
+from PIL import Image
+
+from config import CLIP_MODEL_NAME
+from services.clip_onnx import load_onnx_encoder
+from services.clip_service import (
+    LABEL_FAMILIES, LABEL_THRESHOLDS, LabelScorer,
+    encode_labels, get_family_labels, build_tags
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def load_images(images_dir: str, limit: int) -> list:
+    if not images_dir:
+        rng = np.random.default_rng(0)
+        return [
+            Image.fromarray(rng.integers(0, 255, (320, 240, 3), dtype=np.uint8))
+            for _ in range(limit)
+        ]
+
+    names = sorted(n for n in os.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    return [Image.open(os.path.join(images_dir, n)).convert("RGB") for n in names]
+
+
+def tag_images(model, images_tensor: torch.Tensor, batch_size: int) -> tuple:
+    """Encode labels and images with one backend; returns (tags, features, seconds per image)."""
+    with torch.no_grad():
+        scorer = LabelScorer(
+            {family: encode_labels(model, get_family_labels(family)) for family in LABEL_FAMILIES},
+            thresholds=LABEL_THRESHOLDS
+        )
+
+        tags, features = [], []
+        started = time.perf_counter()
+        for start in range(0, len(images_tensor), batch_size):
+            batch_features = model.encode_image(images_tensor[start:start + batch_size]).float()
+            batch_features /= batch_features.norm(dim=-1, keepdim=True)
+            for row, predictions in enumerate(scorer.score(batch_features)):
+                tags.append(build_tags(batch_features[row:row + 1], predictions))
+            features.append(batch_features)
+        elapsed = time.perf_counter() - started
+
+    return tags, torch.cat(features), elapsed / len(images_tensor)
+
+
+def compare(reference: list, candidate: list) -> dict:
+    """Per-field agreement rate between two lists of generate_tags results."""
+    fields = {}
+    exact = 0
+    for ref, cand in zip(reference, candidate):
+        ref_fields = {"categoryGroup": ref["categoryGroup"], "category": ref["category"], **ref["attributes"]}
+        cand_fields = {"categoryGroup": cand["categoryGroup"], "category": cand["category"], **cand["attributes"]}
+
+        for key in set(ref_fields) | set(cand_fields):
+            match, total = fields.get(key, (0, 0))
+            fields[key] = (match + (ref_fields.get(key) == cand_fields.get(key)), total + 1)
+        exact += ref_fields == cand_fields
+
+    return {
+        "exact_match": exact / len(reference),
+        "fields": {key: round(match / total, 4) for key, (match, total) in sorted(fields.items())}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PyTorch and ONNX CLIP tagging")
+    parser.add_argument("--images", help="Directory of sample garment images")
+    parser.add_argument("--limit", type=int, default=64, help="Max images to compare")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--fp32", action="store_true", help="Compare the fp32 ONNX model instead of INT8")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    torch_model, preprocess = clip.load(CLIP_MODEL_NAME, device="cpu", jit=False)
+    onnx_model = load_onnx_encoder(quantized=not args.fp32)
+
+    images = load_images(args.images, args.limit)
+    images_tensor = torch.stack([preprocess(image) for image in images])
+
+    torch_tags, torch_features, torch_latency = tag_images(torch_model, images_tensor, args.batch_size)
+    onnx_tags, onnx_features, onnx_latency = tag_images(onnx_model, images_tensor, args.batch_size)
+
+    cosine = (torch_features * onnx_features).sum(dim=-1)
+    report = {
+        "model": CLIP_MODEL_NAME,
+        "onnx_variant": "fp32" if args.fp32 else "int8",
+        "images": len(images),
+        "synthetic": not args.images,
+        "agreement": compare(torch_tags, onnx_tags),
+        "embedding_cosine": {"mean": round(cosine.mean().item(), 5), "min": round(cosine.min().item(), 5)},
+        "latency_ms_per_image": {
+            "torch": round(torch_latency * 1000, 2),
+            "onnx": round(onnx_latency * 1000, 2)
+        }
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Rebuild the wardrobe_embeddings Qdrant collection into the configured layout.
+
+Run after changing QDRANT_QUANTIZATION, QDRANT_VECTORS_ON_DISK or the
+QDRANT_HNSW_* settings: a new versioned collection is created and filled from
+the current one, then the wardrobe_embeddings_current alias is switched to it,
+so the API keeps serving searches throughout. Writes wait only during the final
+sync of points changed since the copy.
+
+Usage:
+    python -m scripts.migrate_qdrant_collection
+    python -m scripts.migrate_qdrant_collection --batch-size 512 --keep-old
+    python -m scripts.migrate_qdrant_collection --release-freeze   # after an interrupted run
+"""
+import argparse
+import json
+import time
+
+from services.qdrant_service import migrate_collection, release_write_freeze
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild wardrobe_embeddings into the configured layout")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per Qdrant scroll / upsert batch")
+    parser.add_argument("--keep-old", action="store_true", help="Keep the previous collection after switching")
+    parser.add_argument("--release-freeze", action="store_true", help="Only release the write freeze of an interrupted run")
+    args = parser.parse_args()
+
+    if args.release_freeze:
+        release_write_freeze()
+        return
+
+    started = time.monotonic()
+    stats = migrate_collection(batch_size=args.batch_size, keep_old=args.keep_old)
+    stats["seconds"] = round(time.monotonic() - started, 2)
+
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Re-tag existing wardrobe items from their stored CLIP embeddings.
+
+Run after editing tags/clip_labels.json: every item is re-scored against the
+new labels without downloading or re-encoding any image, then
+wardrobe_items, wardrobe_tags and the Qdrant payloads are updated in bulk.
+
+Usage:
+    python -m scripts.retag_wardrobe --dry-run
+    python -m scripts.retag_wardrobe --batch-size 512
+    python -m scripts.retag_wardrobe --user-id <uuid>
+"""
+import argparse
+import json
+import time
+
+from services.clip_service import clip_model_manager
+from services.retag_service import RetagService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-tag wardrobe items from stored embeddings")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per Qdrant scroll batch")
+    parser.add_argument("--user-id", help="Only re-tag this user's items")
+    parser.add_argument("--dry-run", action="store_true", help="Count changes without writing anything")
+    args = parser.parse_args()
+
+    clip_model_manager.load()
+
+    started = time.monotonic()
+    stats = RetagService.retag_wardrobe(batch_size=args.batch_size, user_id=args.user_id, dry_run=args.dry_run)
+    stats["dry_run"] = args.dry_run
+    stats["seconds"] = round(time.monotonic() - started, 2)
+
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
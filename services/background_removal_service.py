@@ -1,17 +1,142 @@
-from rembg import remove
-from PIL import Image
+from PIL import Image, ImageFilter, ImageOps
+from contextlib import contextmanager
 import io
+import queue
+import threading
 
+from config import (
+    REMBG_MODEL, REMBG_POOL_SIZE, REMBG_INTRA_OP_THREADS, REMBG_INTER_OP_THREADS,
+    REMBG_SEGMENT_MAX_SIDE, REMBG_MASK_REFINE, UPLOAD_MAX_PIXELS
+)
 
-def remove_background(file) -> io.BytesIO:
+# Short names accepted in REMBG_MODEL -> rembg session names
+REMBG_MODEL_ALIASES = {
+    "isnet": "isnet-general-use",
+}
+
+
+class RembgSessionPool:
+    """
+    Fixed set of rembg sessions, created once per process.
+
+    Building a session loads the ONNX model, so it must not happen per
+    request. Callers check a session out for the duration of one remove()
+    call; with every session busy they wait, which caps concurrent
+    segmentations at the pool size (size x intra-op threads ~ CPU budget).
+    """
+
+    def __init__(self, model_name: str, size: int, intra_op_threads: int = 0, inter_op_threads: int = 0):
+        # Imported lazily: rembg pulls in onnxruntime, which API workers using the
+        # inference server never need
+        import onnxruntime as ort
+        from rembg import new_session
+
+        self.model_name = REMBG_MODEL_ALIASES.get(model_name, model_name)
+        self.size = size
+        self._sessions = queue.Queue()
+
+        print(f"Creating {size} rembg session(s) for {self.model_name}...")
+        for _ in range(size):
+            sess_opts = ort.SessionOptions()
+            if intra_op_threads:
+                sess_opts.intra_op_num_threads = intra_op_threads
+            if inter_op_threads:
+                sess_opts.inter_op_num_threads = inter_op_threads
+            self._sessions.put(new_session(self.model_name, sess_opts=sess_opts))
+
+    @contextmanager
+    def session(self):
+        session = self._sessions.get()
+        try:
+            yield session
+        finally:
+            self._sessions.put(session)
+
+
+_session_pool = None
+_session_pool_lock = threading.Lock()
+
+
+def get_rembg_session_pool() -> RembgSessionPool:
+    """Process-wide session pool, created on first use."""
+    global _session_pool
+
+    if _session_pool is None:
+        with _session_pool_lock:
+            if _session_pool is None:
+                _session_pool = RembgSessionPool(
+                    REMBG_MODEL,
+                    REMBG_POOL_SIZE,
+                    intra_op_threads=REMBG_INTRA_OP_THREADS,
+                    inter_op_threads=REMBG_INTER_OP_THREADS
+                )
+    return _session_pool
+
+
+def segment_mask(image: Image.Image, session) -> Image.Image:
+    """
+    Foreground mask ("L", same size as image) from the rembg session.
+
+    The models segment at a fixed low resolution internally (320px for u2net,
+    1024px for isnet), so with REMBG_SEGMENT_MAX_SIDE set the image is first
+    downscaled to that long edge and only the mask is upsampled back. This
+    keeps segmentation cost flat regardless of input megapixels.
+    """
+    from rembg import remove
+
+    if REMBG_SEGMENT_MAX_SIDE and max(image.size) > REMBG_SEGMENT_MAX_SIDE:
+        scale = REMBG_SEGMENT_MAX_SIDE / max(image.size)
+        target_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # Resize straight from the original; no full-resolution copy
+        small = image.resize(target_size, Image.BILINEAR, reducing_gap=2.0)
+        mask = remove(small, session=session, only_mask=True)
+        mask = mask.resize(image.size, Image.BILINEAR)
+
+        if REMBG_MASK_REFINE:
+            # Soften the staircase edges left by upsampling
+            radius = max(1, max(image.size) // (REMBG_SEGMENT_MAX_SIDE * 2))
+            mask = mask.filter(ImageFilter.GaussianBlur(radius))
+        return mask
+
+    return remove(image, session=session, only_mask=True)
+
+
+def open_image(file, max_pixels: int = UPLOAD_MAX_PIXELS) -> Image.Image:
+    """
+    Decode an upload as an upright RGB image of at most max_pixels.
+
+    JPEGs are draft-decoded at the smallest DCT scale (1/2, 1/4, 1/8) that
+    still covers the budget, so a 48MP photo is never fully decoded; anything
+    still over budget is downscaled. EXIF orientation is applied last, on the
+    already reduced image.
+    """
+    image = Image.open(file)
+
+    if max_pixels and image.width * image.height > max_pixels:
+        scale = (max_pixels / (image.width * image.height)) ** 0.5
+        target = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        if image.format == "JPEG":
+            image.draft("RGB", target)
+        if image.width * image.height > max_pixels:
+            image.thumbnail(target, Image.BILINEAR, reducing_gap=2.0)
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    return image
+
+
+def remove_background_image(file) -> Image.Image:
     """Removes outfit background, auto-crops to content bounds, and adds white background."""
-    input_image = Image.open(file)
-    output_image = remove(input_image)
+    input_image = open_image(file)
+
+    with get_rembg_session_pool().session() as session:
+        mask = segment_mask(input_image, session)
 
-    # Auto-crop to content bounds using alpha channel
+    # Auto-crop to content bounds using the mask
     # getbbox() returns bounding box of non-zero (non-transparent) regions
-    alpha_channel = output_image.split()[3]
-    bbox = alpha_channel.getbbox()
+    bbox = mask.getbbox()
 
     if bbox:
         # Add small padding around the content (5% of dimensions)
@@ -22,22 +147,30 @@ def remove_background(file) -> io.BytesIO:
         padded_bbox = (
             max(0, bbox[0] - padding_x),
             max(0, bbox[1] - padding_y),
-            min(output_image.width, bbox[2] + padding_x),
-            min(output_image.height, bbox[3] + padding_y)
+            min(input_image.width, bbox[2] + padding_x),
+            min(input_image.height, bbox[3] + padding_y)
         )
 
-        # Crop to the content bounding box with padding
-        output_image = output_image.crop(padded_bbox)
+        # Crop the original and its mask to the content bounding box with padding
+        input_image = input_image.crop(padded_bbox)
+        mask = mask.crop(padded_bbox)
 
-    # Create white background and paste the image with transparency
-    white_bg = Image.new("RGBA", output_image.size, (255, 255, 255, 255))
-    white_bg.paste(output_image, mask=output_image.split()[3])
+    # Fill the background with white in place, so the (cropped) original is
+    # the only full-size copy
+    input_image.paste((255, 255, 255), mask=ImageOps.invert(mask))
 
-    # Convert to RGB (removes alpha channel)
-    final_image = white_bg.convert("RGB")
+    return input_image
 
+
+def encode_png(image: Image.Image) -> io.BytesIO:
+    """Encode a PIL image as PNG into an in-memory buffer."""
     output_buffer = io.BytesIO()
-    final_image.save(output_buffer, format="PNG")
+    image.save(output_buffer, format="PNG")
     output_buffer.seek(0)
 
     return output_buffer
+
+
+def remove_background(file) -> io.BytesIO:
+    """Same as remove_background_image, returned as a PNG buffer."""
+    return encode_png(remove_background_image(file))
@@ -0,0 +1,154 @@
+import os
+from typing import Tuple
+
+import numpy as np
+import torch
+import clip
+import onnxruntime as ort
+
+from config import CLIP_MODEL_NAME, CLIP_ONNX_DIR, CLIP_ONNX_QUANTIZED, CLIP_ONNX_THREADS
+
+
+class _ImageEncoder(torch.nn.Module):
+    """Wraps model.encode_image so torch.onnx.export sees it as forward()."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, image):
+        return self.model.encode_image(image)
+
+
+class _TextEncoder(torch.nn.Module):
+    """Wraps model.encode_text so torch.onnx.export sees it as forward()."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, tokens):
+        return self.model.encode_text(tokens)
+
+
+def get_onnx_paths(quantized: bool) -> Tuple[str, str]:
+    """(image encoder path, text encoder path) for the configured CLIP model."""
+    model_slug = CLIP_MODEL_NAME.replace("/", "-")
+    suffix = ".int8" if quantized else ""
+    return (
+        os.path.join(CLIP_ONNX_DIR, f"{model_slug}_image{suffix}.onnx"),
+        os.path.join(CLIP_ONNX_DIR, f"{model_slug}_text{suffix}.onnx")
+    )
+
+
+def _tmp_path(path: str) -> str:
+    """Per-process temp file next to path; written there, then os.replace'd into place."""
+    return f"{path}.{os.getpid()}.tmp.onnx"
+
+
+def export_onnx(model, opset: int = 17) -> Tuple[str, str]:
+    """
+    Export the fp32 image and text encoders of a CPU CLIP model to ONNX.
+    Both graphs take a dynamic batch dimension. Each file is written to a temp
+    path and renamed, so concurrent workers never load a half-written model.
+    """
+    os.makedirs(CLIP_ONNX_DIR, exist_ok=True)
+    image_path, text_path = get_onnx_paths(quantized=False)
+
+    model = model.float().eval()
+    resolution = model.visual.input_resolution
+    dummy_image = torch.randn(1, 3, resolution, resolution)
+    dummy_tokens = clip.tokenize(["a product photo of a shirt"])
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _ImageEncoder(model),
+            (dummy_image,),
+            _tmp_path(image_path),
+            input_names=["image"],
+            output_names=["features"],
+            dynamic_axes={"image": {0: "batch"}, "features": {0: "batch"}},
+            opset_version=opset,
+            dynamo=False
+        )
+        torch.onnx.export(
+            _TextEncoder(model),
+            (dummy_tokens,),
+            _tmp_path(text_path),
+            input_names=["tokens"],
+            output_names=["features"],
+            dynamic_axes={"tokens": {0: "batch"}, "features": {0: "batch"}},
+            opset_version=opset,
+            dynamo=False
+        )
+
+    os.replace(_tmp_path(image_path), image_path)
+    os.replace(_tmp_path(text_path), text_path)
+
+    print(f"Exported CLIP ONNX encoders: {image_path}, {text_path}")
+    return image_path, text_path
+
+
+def quantize_onnx(fp32_path: str, int8_path: str) -> str:
+    """Dynamic INT8 quantization (int8 weights, activations quantized at runtime)."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(fp32_path, _tmp_path(int8_path), weight_type=QuantType.QInt8)
+    os.replace(_tmp_path(int8_path), int8_path)
+    print(f"Quantized {fp32_path} -> {int8_path}")
+    return int8_path
+
+
+def ensure_onnx_models(quantized: bool = CLIP_ONNX_QUANTIZED) -> Tuple[str, str]:
+    """Return encoder paths, exporting (and quantizing) from the PyTorch model if missing."""
+    paths = get_onnx_paths(quantized)
+    if all(os.path.exists(path) for path in paths):
+        return paths
+
+    fp32_paths = get_onnx_paths(quantized=False)
+    if not all(os.path.exists(path) for path in fp32_paths):
+        print(f"Exporting {CLIP_MODEL_NAME} to ONNX...")
+        model, _ = clip.load(CLIP_MODEL_NAME, device="cpu", jit=False)
+        export_onnx(model)
+        del model
+
+    if not quantized:
+        return fp32_paths
+
+    return tuple(quantize_onnx(fp32_path, path) for fp32_path, path in zip(fp32_paths, paths))
+
+
+class OnnxClipEncoder:
+    """
+    ONNX Runtime (CPU) stand-in for the CLIP model.
+
+    Exposes the same encode_image / encode_text methods, taking and returning
+    torch tensors, so clip_service code works the same on either backend.
+    """
+
+    def __init__(self, image_path: str, text_path: str, threads: int = CLIP_ONNX_THREADS):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        providers = ["CPUExecutionProvider"]
+        self.image_session = ort.InferenceSession(image_path, options, providers=providers)
+        self.text_session = ort.InferenceSession(text_path, options, providers=providers)
+
+        # Height/width are static in the exported graph
+        self.input_resolution = self.image_session.get_inputs()[0].shape[2]
+
+    def encode_image(self, image: torch.Tensor) -> torch.Tensor:
+        inputs = {"image": image.detach().cpu().numpy().astype(np.float32)}
+        return torch.from_numpy(self.image_session.run(None, inputs)[0])
+
+    def encode_text(self, tokens: torch.Tensor) -> torch.Tensor:
+        inputs = {"tokens": tokens.detach().cpu().numpy().astype(np.int64)}
+        return torch.from_numpy(self.text_session.run(None, inputs)[0])
+
+
+def load_onnx_encoder(quantized: bool = CLIP_ONNX_QUANTIZED) -> OnnxClipEncoder:
+    image_path, text_path = ensure_onnx_models(quantized)
+    print(f"Loading CLIP ONNX encoders ({'int8' if quantized else 'fp32'})...")
+    return OnnxClipEncoder(image_path, text_path)
@@ -1,13 +1,24 @@
+import atexit
+import hashlib
 import json
 import os
-import requests
+import threading
+import time
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Union
 
+import numpy as np
 import torch
 import clip
 from PIL import Image
 
-from config import MINIO_ENDPOINT, MINIO_PUBLIC_URL, MINIO_SECURE
+from services.inference_client import ClipModelNotReadyError
+from services.embedding_cache import TextEmbeddingCache, normalize_text
+from config import (
+    CLIP_MODEL_NAME, CLIP_CACHE_DIR, CLIP_BATCH_SIZE, CLIP_PREPROCESS_WORKERS, CLIP_READY_TIMEOUT,
+    CLIP_BACKEND, CLIP_ONNX_QUANTIZED, CLIP_TEXT_CACHE_SIZE, CLIP_TEXT_CACHE_PATH
+)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TAGS_DIR = os.path.join(BASE_DIR, "tags")
@@ -18,87 +29,395 @@ def load_json(filename: str) -> dict:
         return json.load(f)
 
 
+# Anything generate_tags can tag: a decoded image, encoded bytes/buffer, or an image URL
+ImageInput = Union[Image.Image, bytes, BinaryIO, str]
+
 # Load tag definitions
 CLIP_LABELS = load_json("clip_labels.json")
 
-# CLIP model setup
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model, preprocess = clip.load("ViT-B/32", device=device)
+# CLIP device; the model itself is loaded lazily by clip_model_manager.
+# The ONNX backend always runs on CPU.
+device = "cuda" if torch.cuda.is_available() and CLIP_BACKEND == "torch" else "cpu"
+
+# Identifies the encoder variant; label embeddings differ slightly between backends
+if CLIP_BACKEND == "onnx":
+    BACKEND_ID = "onnx-int8" if CLIP_ONNX_QUANTIZED else "onnx"
+else:
+    BACKEND_ID = "torch"
+
+
+class LabelMatrix(NamedTuple):
+    """Labels of one attribute family and their stacked, normalized text features."""
+    labels: List[str]
+    matrix: torch.Tensor
 
 
-def encode_labels(labels_dict: dict) -> dict:
-    """Pre-encode text labels for CLIP."""
-    encoded = {}
+def encode_labels(model, labels_dict: dict) -> LabelMatrix:
+    """Pre-encode text labels for CLIP into a single (num_labels, dim) matrix."""
+    rows = []
     with torch.no_grad():
         for key, prompts in labels_dict.items():
             tokens = clip.tokenize(prompts).to(device)
             feats = model.encode_text(tokens)
             feats /= feats.norm(dim=-1, keepdim=True)
-            encoded[key] = feats.mean(dim=0)
-    return encoded
+            rows.append(feats.mean(dim=0))
 
+    # Re-normalize the prompt means so a plain dot product is the cosine similarity
+    matrix = torch.stack(rows)
+    matrix /= matrix.norm(dim=-1, keepdim=True)
+    return LabelMatrix(list(labels_dict.keys()), matrix)
 
-def predict_from_image(image_features, encoded_labels: dict, threshold: float = 0.20) -> tuple:
+
+def predict_from_image(image_features, encoded_labels: LabelMatrix, threshold: float = 0.20) -> tuple:
     """
     Predict best matching label from encoded labels.
     Returns: (best_label, score)
     """
-    scores = {}
-    for label, text_feat in encoded_labels.items():
-        score = torch.cosine_similarity(
-            image_features, text_feat.unsqueeze(0)
-        ).item()
-        scores[label] = score
+    image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+    scores = image_features[0].to(encoded_labels.matrix.dtype) @ encoded_labels.matrix.T
 
-    best_label = max(scores, key=scores.get)
-    best_score = scores[best_label]
+    best_index = int(torch.argmax(scores))
+    best_label = encoded_labels.labels[best_index]
+    best_score = scores[best_index].item()
 
     return (best_label, best_score) if best_score >= threshold else (None, best_score)
 
 
-# Pre-encode all CLIP labels on startup
-print("Loading CLIP labels...")
+class LabelScorer:
+    """
+    Scores image features against every label family with one matmul.
+
+    All family matrices are concatenated into a single (total_labels, dim) matrix.
+    After the matmul, a padded (families, max_labels) index gathers each family's
+    scores so the best label and threshold check for all families happen in one
+    vectorized max instead of one cosine_similarity + .item() per label.
+    """
+
+    def __init__(self, families: Dict[tuple, LabelMatrix], thresholds: Dict[tuple, float]):
+        self.families = list(families.keys())
+        self.labels = [families[family].labels for family in self.families]
+        self.matrix = torch.cat([families[family].matrix for family in self.families])
+
+        width = max(len(labels) for labels in self.labels)
+        self.index = torch.zeros((len(self.families), width), dtype=torch.long, device=self.matrix.device)
+        self.mask = torch.zeros((len(self.families), width), dtype=torch.bool, device=self.matrix.device)
+
+        offset = 0
+        for row, labels in enumerate(self.labels):
+            self.index[row, :len(labels)] = torch.arange(offset, offset + len(labels))
+            self.mask[row, :len(labels)] = True
+            offset += len(labels)
+
+        self.thresholds = torch.tensor(
+            [thresholds[family] for family in self.families],
+            dtype=torch.float32,
+            device=self.matrix.device
+        )
+
+    def score(self, image_features) -> List[Dict[tuple, tuple]]:
+        """
+        Score a (batch, dim) tensor of image features against all families.
+
+        Returns one dict per image mapping family -> (best_label or None, score),
+        with the same semantics as predict_from_image.
+        """
+        with torch.no_grad():
+            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+            similarities = image_features.to(self.matrix.dtype) @ self.matrix.T
+
+            grouped = similarities[:, self.index].masked_fill(~self.mask, float("-inf"))
+            best_scores, best_indices = grouped.max(dim=-1)
+            best_scores = best_scores.float()
+            accepted = best_scores >= self.thresholds
+
+        # Single device sync for the whole batch
+        best_scores = best_scores.cpu().tolist()
+        best_indices = best_indices.cpu().tolist()
+        accepted = accepted.cpu().tolist()
+
+        return [
+            {
+                family: (
+                    self.labels[row][best_indices[b][row]] if accepted[b][row] else None,
+                    best_scores[b][row]
+                )
+                for row, family in enumerate(self.families)
+            }
+            for b in range(len(best_scores))
+        ]
+
+
+# Label families in a fixed order; the on-disk cache stores their matrices stacked in this order
+LABEL_FAMILIES = [
+    ("categoryGroups",),
+    ("colors",),
+    ("patterns",),
+    ("materials",),
+    ("seasons",),
+    ("occasions",),
+]
+LABEL_FAMILIES += [("categories", group) for group in CLIP_LABELS["categories"]]
+LABEL_FAMILIES += [("specificAttributes", name) for name in CLIP_LABELS["specificAttributes"]]
+
+# Bump when the encoding procedure changes so stale caches are ignored
+LABEL_CACHE_VERSION = 1
+
+
+def get_family_labels(family: tuple) -> dict:
+    """Look up the {label: [prompts]} dict for a family key like ("categories", "upperWear")."""
+    labels = CLIP_LABELS
+    for key in family:
+        labels = labels[key]
+    return labels
+
+
+def get_label_cache_path() -> str:
+    """Cache file path, keyed by clip_labels.json contents, model name, backend and cache version."""
+    digest = hashlib.sha256(f"{LABEL_CACHE_VERSION}:{CLIP_MODEL_NAME}:{BACKEND_ID}:".encode())
+    with open(os.path.join(TAGS_DIR, "clip_labels.json"), "rb") as f:
+        digest.update(f.read())
+
+    model_slug = CLIP_MODEL_NAME.replace("/", "-")
+    return os.path.join(CLIP_CACHE_DIR, f"clip_labels_{model_slug}_{BACKEND_ID}_{digest.hexdigest()[:16]}.npy")
+
+
+def load_label_matrices(model) -> Dict[tuple, LabelMatrix]:
+    """
+    Load encoded label matrices from the on-disk cache, or encode and cache them.
+
+    All family matrices are stored as one float32 .npy array stacked in
+    LABEL_FAMILIES order; labels come from clip_labels.json itself, which the
+    cache key already pins.
+    """
+    label_lists = {family: list(get_family_labels(family).keys()) for family in LABEL_FAMILIES}
+    total_labels = sum(len(labels) for labels in label_lists.values())
+    cache_path = get_label_cache_path()
+
+    if os.path.exists(cache_path):
+        try:
+            stacked = np.load(cache_path)
+            if stacked.shape[0] == total_labels:
+                matrix = torch.from_numpy(stacked).to(device)
+                matrices = {}
+                offset = 0
+                for family in LABEL_FAMILIES:
+                    size = len(label_lists[family])
+                    matrices[family] = LabelMatrix(label_lists[family], matrix[offset:offset + size])
+                    offset += size
+                print(f"Loaded CLIP label embeddings from cache: {cache_path}")
+                return matrices
+            print(f"CLIP label cache has {stacked.shape[0]} rows, expected {total_labels}; re-encoding")
+        except Exception as e:
+            print(f"Failed to load CLIP label cache {cache_path}: {e}")
+
+    matrices = {family: encode_labels(model, get_family_labels(family)) for family in LABEL_FAMILIES}
+
+    # Write to a temp file and rename so concurrent workers never read a partial cache
+    try:
+        os.makedirs(CLIP_CACHE_DIR, exist_ok=True)
+        stacked = torch.cat([matrices[family].matrix for family in LABEL_FAMILIES]).float().cpu().numpy()
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, stacked)
+        os.replace(tmp_path, cache_path)
+        print(f"Saved CLIP label embeddings to cache: {cache_path}")
+    except Exception as e:
+        print(f"Failed to save CLIP label cache {cache_path}: {e}")
+
+    return matrices
+
+
+# Specific attributes predicted per category group: (label family, attribute key)
+SPECIFIC_ATTRIBUTES_BY_GROUP = {
+    "upperWear": [("neckline", "neckline"), ("sleeveLength", "sleeveLength"), ("topLength", "topLength")],
+    "bottomWear": [("fit", "fit"), ("bottomLength", "length"), ("rise", "rise")],
+    "outerWear": [("thickness", "thickness")],
+    "footwear": [("footwearUsage", "usageType")],
+}
+
+# Category groups use a stricter threshold than every other family
+LABEL_THRESHOLDS = {family: 0.20 if family == ("categoryGroups",) else 0.15 for family in LABEL_FAMILIES}
+
+
+def load_encoder() -> tuple:
+    """
+    Load (model, preprocess) for the configured backend.
+
+    The ONNX backend returns an OnnxClipEncoder with the same encode_image /
+    encode_text interface and skips loading the PyTorch weights entirely
+    (unless the ONNX files still have to be exported).
+    """
+    if CLIP_BACKEND == "onnx":
+        from services.clip_onnx import load_onnx_encoder
+
+        model = load_onnx_encoder(quantized=CLIP_ONNX_QUANTIZED)
+        return model, clip.clip._transform(model.input_resolution)
+
+    return clip.load(CLIP_MODEL_NAME, device=device)
+
+
+class ClipModelManager:
+    """
+    Owns the CLIP model, its preprocess transform and the label scorer.
+
+    Nothing is loaded at import time: start() kicks off loading in a background
+    thread after app startup, and anything that needs CLIP calls
+    wait_until_ready(), which blocks up to a timeout and raises
+    ClipModelNotReadyError otherwise. status() backs the readiness probe.
+    """
+
+    COLD = "cold"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self.state = self.COLD
+        self.error = None
+        self.load_seconds = None
+
+        self.model = None
+        self.preprocess = None
+        self.label_matrices = None
+        self.scorer = None
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self):
+        """Start loading in a background thread. No-op if already loading or loaded."""
+        with self._lock:
+            if self.state in (self.LOADING, self.READY):
+                return
+            self.state = self.LOADING
+            self.error = None
+            self._done.clear()
+
+        threading.Thread(target=self._load, name="clip-model-loader", daemon=True).start()
+
+    def load(self):
+        """Load synchronously (e.g. for scripts and the Docker build warm-up)."""
+        self.start()
+        self._done.wait()
+        if self.state != self.READY:
+            raise ClipModelNotReadyError(f"CLIP model failed to load: {self.error}")
+        return self
+
+    def _load(self):
+        started = time.monotonic()
+        try:
+            print(f"Loading CLIP model {CLIP_MODEL_NAME} ({BACKEND_ID}) on {device}...")
+            model, preprocess = load_encoder()
+
+            print("Loading CLIP labels...")
+            label_matrices = load_label_matrices(model)
+            scorer = LabelScorer(label_matrices, thresholds=LABEL_THRESHOLDS)
+            print("CLIP labels loaded.")
+
+            text_embedding_cache.load()
+
+            self.model = model
+            self.preprocess = preprocess
+            self.label_matrices = label_matrices
+            self.scorer = scorer
+            self.load_seconds = round(time.monotonic() - started, 2)
+            self.state = self.READY
+            print(f"CLIP model ready in {self.load_seconds}s")
+        except Exception as e:
+            self.error = str(e)
+            self.state = self.FAILED
+            print(f"Failed to load CLIP model: {e}")
+        finally:
+            self._done.set()
+
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> "ClipModelManager":
+        """Block until the model is loaded, starting the load if nobody has yet."""
+        if self.state in (self.COLD, self.FAILED):
+            self.start()
+
+        self._done.wait(timeout)
+
+        if self.state != self.READY:
+            if self.state == self.FAILED:
+                raise ClipModelNotReadyError(f"CLIP model failed to load: {self.error}")
+            raise ClipModelNotReadyError("CLIP model is still loading, please retry shortly")
+        return self
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "warm": self.state == self.READY,
+            "model": CLIP_MODEL_NAME,
+            "backend": BACKEND_ID,
+            "device": device,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+            "text_cache": text_embedding_cache.stats()
+        }
+
 
-ENCODED_CATEGORY_GROUPS = encode_labels(CLIP_LABELS["categoryGroups"])
-ENCODED_COLORS = encode_labels(CLIP_LABELS["colors"])
-ENCODED_PATTERNS = encode_labels(CLIP_LABELS["patterns"])
-ENCODED_MATERIALS = encode_labels(CLIP_LABELS["materials"])
-ENCODED_SEASONS = encode_labels(CLIP_LABELS["seasons"])
-ENCODED_OCCASIONS = encode_labels(CLIP_LABELS["occasions"])
+clip_model_manager = ClipModelManager()
 
-# Encode categories per group
-ENCODED_CATEGORIES = {}
-for group, categories in CLIP_LABELS["categories"].items():
-    ENCODED_CATEGORIES[group] = encode_labels(categories)
+# Repeated search queries ("black jeans") skip the text encoder entirely
+text_embedding_cache = TextEmbeddingCache(
+    max_entries=CLIP_TEXT_CACHE_SIZE,
+    path=CLIP_TEXT_CACHE_PATH or None,
+    model_id=f"{CLIP_MODEL_NAME}:{BACKEND_ID}"
+)
+atexit.register(text_embedding_cache.save)
 
-# Encode specific attributes
-ENCODED_SPECIFIC_ATTRS = {}
-for attr_name, attr_values in CLIP_LABELS["specificAttributes"].items():
-    ENCODED_SPECIFIC_ATTRS[attr_name] = encode_labels(attr_values)
 
-print("CLIP labels loaded.")
+def get_clip_model() -> ClipModelManager:
+    """Return the loaded model manager, waiting up to CLIP_READY_TIMEOUT for it."""
+    return clip_model_manager.wait_until_ready(timeout=CLIP_READY_TIMEOUT)
 
 
-def get_image_features(image_url: str):
-    """Download image and extract CLIP features."""
-    # Convert public URL to internal URL for Docker networking
-    protocol = "https" if MINIO_SECURE else "http"
-    public_prefix = f"{protocol}://{MINIO_PUBLIC_URL}/"
-    internal_prefix = f"{protocol}://{MINIO_ENDPOINT}/"
+def download_image(image_url: str) -> Image.Image:
+    """Download an image (read directly from MinIO for our objects) and decode it as RGB."""
+    # Imported lazily: s3_service connects to MinIO on import, which tagging
+    # in-memory images (and the benchmarks) never need
+    from services.s3_service import read_image_bytes
 
-    internal_url = image_url.replace(public_prefix, internal_prefix)
+    return Image.open(BytesIO(read_image_bytes(image_url))).convert("RGB")
 
-    response = requests.get(internal_url)
-    image = Image.open(BytesIO(response.content)).convert("RGB")
-    image_input = preprocess(image).unsqueeze(0).to(device)
 
+def load_image(image: ImageInput) -> Image.Image:
+    """
+    Resolve any supported image input to an RGB PIL image.
+
+    Accepts an already-decoded PIL image (used as-is when it is RGB), raw bytes,
+    a file-like buffer, or an image URL (downloaded from MinIO).
+    """
+    if isinstance(image, Image.Image):
+        return image if image.mode == "RGB" else image.convert("RGB")
+    if isinstance(image, (bytes, bytearray)):
+        return Image.open(BytesIO(image)).convert("RGB")
+    if hasattr(image, "read"):
+        image.seek(0)
+        return Image.open(image).convert("RGB")
+    return download_image(image)
+
+
+def encode_images(image_inputs: torch.Tensor):
+    """Run the image encoder on a preprocessed (batch, 3, H, W) tensor and normalize."""
+    model = get_clip_model().model
     with torch.no_grad():
-        image_features = model.encode_image(image_input)
+        image_features = model.encode_image(image_inputs.to(device))
 
     image_features /= image_features.norm(dim=-1, keepdim=True)
     return image_features
 
 
+def get_image_features(image: ImageInput):
+    """Load image (PIL image, bytes, buffer or URL) and extract CLIP features."""
+    image = load_image(image)
+    image_input = get_clip_model().preprocess(image).unsqueeze(0)
+    return encode_images(image_input)
+
+
 def get_text_embedding(text: str) -> list:
     """
     Get CLIP embedding for a text prompt.
@@ -109,113 +428,67 @@ def get_text_embedding(text: str) -> list:
     Returns:
         512-dim embedding as list
     """
-    with torch.no_grad():
-        tokens = clip.tokenize([text]).to(device)
-        text_features = model.encode_text(tokens)
-        text_features /= text_features.norm(dim=-1, keepdim=True)
+    return get_text_embeddings([text])[0]
 
-    return text_features.cpu().numpy().flatten().tolist()
 
+def get_text_embeddings(texts: List[str]) -> List[list]:
+    """
+    Get CLIP embeddings for several text prompts.
 
-def get_specific_attributes_for_group(group_key: str, image_features) -> dict:
-    """Get specific attributes for a category group using CLIP."""
-    attributes = {}
+    Served from text_embedding_cache where possible; the remaining unique
+    prompts go through a single encode_text call and are cached.
+    """
+    keys = [normalize_text(text) for text in texts]
+    embeddings = text_embedding_cache.get_many(keys)
 
-    if group_key == "upperWear":
-        # Neckline
-        neckline, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["neckline"], threshold=0.15)
-        if neckline:
-            attributes["neckline"] = neckline
-
-        # Sleeve length
-        sleeve, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["sleeveLength"], threshold=0.15)
-        if sleeve:
-            attributes["sleeveLength"] = sleeve
-
-        # Top length
-        top_length, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["topLength"], threshold=0.15)
-        if top_length:
-            attributes["topLength"] = top_length
-
-    elif group_key == "bottomWear":
-        # Fit
-        fit, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["fit"], threshold=0.15)
-        if fit:
-            attributes["fit"] = fit
-
-        # Length
-        length, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["bottomLength"], threshold=0.15)
-        if length:
-            attributes["length"] = length
-
-        # Rise
-        rise, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["rise"], threshold=0.15)
-        if rise:
-            attributes["rise"] = rise
-
-    elif group_key == "outerWear":
-        # Thickness
-        thickness, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["thickness"], threshold=0.15)
-        if thickness:
-            attributes["thickness"] = thickness
-
-    elif group_key == "footwear":
-        # Usage type
-        usage, _ = predict_from_image(image_features, ENCODED_SPECIFIC_ATTRS["footwearUsage"], threshold=0.15)
-        if usage:
-            attributes["usageType"] = usage
+    missing = list(dict.fromkeys(key for key in keys if key not in embeddings))
+    if missing:
+        model = get_clip_model().model
+        with torch.no_grad():
+            tokens = clip.tokenize(missing).to(device)
+            text_features = model.encode_text(tokens)
+            text_features /= text_features.norm(dim=-1, keepdim=True)
 
-    return attributes
+        encoded = dict(zip(missing, text_features.cpu().numpy().tolist()))
+        text_embedding_cache.put_many(encoded)
+        embeddings.update(encoded)
 
+    return [embeddings[key] for key in keys]
 
-def generate_tags(image_url: str) -> dict:
-    """
-    Generate tags for a clothing image using CLIP.
 
-    All predictions made by CLIP:
-    - categoryGroup
-    - category (within the group)
-    - color, pattern, material, season, occasion
-    - specific attributes (neckline, fit, etc.)
+def get_specific_attributes_for_group(group_key: str, predictions: Dict[tuple, tuple]) -> dict:
+    """Get specific attributes for a category group from LabelScorer predictions."""
+    attributes = {}
+
+    for family, attribute_key in SPECIFIC_ATTRIBUTES_BY_GROUP.get(group_key, []):
+        value, _ = predictions[("specificAttributes", family)]
+        if value:
+            attributes[attribute_key] = value
+
+    return attributes
 
-    Returns:
-    {
-        "categoryGroup": "upperWear",
-        "category": "T-Shirt",
-        "attributes": {
-            "color": "Blue",
-            "pattern": "Solid",
-            "material": "Cotton",
-            "season": "Summer",
-            "occasion": "Casual",
-            "neckline": "Round",
-            "sleeveLength": "Short Sleeve",
-            "topLength": "Waist"
-        }
-    }
-    """
-    # Get image features once
-    image_features = get_image_features(image_url)
 
+def build_tags(image_features, predictions: Dict[tuple, tuple]) -> dict:
+    """Turn LabelScorer predictions for one image into the generate_tags result."""
     # Predict category group
-    group_key, _ = predict_from_image(image_features, ENCODED_CATEGORY_GROUPS, threshold=0.20)
+    group_key, _ = predictions[("categoryGroups",)]
     if not group_key:
         group_key = "otherItems"
 
     # Predict category within the group
     category = None
-    if group_key in ENCODED_CATEGORIES:
-        category, _ = predict_from_image(image_features, ENCODED_CATEGORIES[group_key], threshold=0.15)
+    if ("categories", group_key) in predictions:
+        category, _ = predictions[("categories", group_key)]
 
     if not category:
         category = "Other"
 
     # Predict generic attributes
-    color, _ = predict_from_image(image_features, ENCODED_COLORS, threshold=0.15)
-    pattern, _ = predict_from_image(image_features, ENCODED_PATTERNS, threshold=0.15)
-    material, _ = predict_from_image(image_features, ENCODED_MATERIALS, threshold=0.15)
-    season, _ = predict_from_image(image_features, ENCODED_SEASONS, threshold=0.15)
-    occasion, _ = predict_from_image(image_features, ENCODED_OCCASIONS, threshold=0.15)
+    color, _ = predictions[("colors",)]
+    pattern, _ = predictions[("patterns",)]
+    material, _ = predictions[("materials",)]
+    season, _ = predictions[("seasons",)]
+    occasion, _ = predictions[("occasions",)]
 
     # Build attributes
     attributes = {
@@ -227,7 +500,7 @@ def generate_tags(image_url: str) -> dict:
     }
 
     # Add specific attributes based on category group
-    specific_attrs = get_specific_attributes_for_group(group_key, image_features)
+    specific_attrs = get_specific_attributes_for_group(group_key, predictions)
     attributes.update(specific_attrs)
 
     # Convert embedding to list for storage
@@ -239,3 +512,93 @@ def generate_tags(image_url: str) -> dict:
         "attributes": attributes,
         "embedding": embedding
     }
+
+
+def generate_tags(image: ImageInput) -> dict:
+    """
+    Generate tags for a clothing image using CLIP.
+
+    image can be a PIL image, bytes, a file-like buffer or an image URL.
+    Passing the in-memory image avoids downloading and decoding it again.
+
+    All predictions made by CLIP:
+    - categoryGroup
+    - category (within the group)
+    - color, pattern, material, season, occasion
+    - specific attributes (neckline, fit, etc.)
+
+    Returns:
+    {
+        "categoryGroup": "upperWear",
+        "category": "T-Shirt",
+        "attributes": {
+            "color": "Blue",
+            "pattern": "Solid",
+            "material": "Cotton",
+            "season": "Summer",
+            "occasion": "Casual",
+            "neckline": "Round",
+            "sleeveLength": "Short Sleeve",
+            "topLength": "Waist"
+        }
+    }
+    """
+    # Get image features once and score every label family in one pass
+    image_features = get_image_features(image)
+    predictions = get_clip_model().scorer.score(image_features)[0]
+
+    return build_tags(image_features, predictions)
+
+
+def generate_tags_from_embeddings(embeddings: List[List[float]]) -> List[dict]:
+    """
+    Re-derive tags from stored image embeddings without running the image encoder.
+
+    Every tag is a function of the embedding and the label matrices, so this
+    is one LabelScorer matmul for the whole list. Returns one generate_tags
+    shaped dict per embedding.
+    """
+    if not embeddings:
+        return []
+
+    clip_model = get_clip_model()
+    image_features = torch.tensor(embeddings, dtype=torch.float32, device=device)
+    predictions = clip_model.scorer.score(image_features)
+
+    return [
+        build_tags(image_features[row:row + 1], item_predictions)
+        for row, item_predictions in enumerate(predictions)
+    ]
+
+
+def _load_and_preprocess(image: ImageInput) -> torch.Tensor:
+    return get_clip_model().preprocess(load_image(image))
+
+
+def generate_tags_batch(images: List[ImageInput]) -> List[dict]:
+    """
+    Generate tags for many clothing images at once.
+
+    images accepts the same inputs as generate_tags. Loading (downloads for
+    URLs) and preprocessing run on a thread pool, then each chunk of
+    CLIP_BATCH_SIZE images goes through a single encode_image call and a single
+    LabelScorer pass. Returns one dict per image, in input order, with the same
+    shape as generate_tags.
+    """
+    if not images:
+        return []
+
+    clip_model = get_clip_model()
+
+    with ThreadPoolExecutor(max_workers=min(CLIP_PREPROCESS_WORKERS, len(images))) as executor:
+        image_inputs = list(executor.map(_load_and_preprocess, images))
+
+    results = []
+    for start in range(0, len(image_inputs), CLIP_BATCH_SIZE):
+        image_features = encode_images(torch.stack(image_inputs[start:start + CLIP_BATCH_SIZE]))
+        predictions = clip_model.scorer.score(image_features)
+
+        for row, item_predictions in enumerate(predictions):
+            results.append(build_tags(image_features[row:row + 1], item_predictions))
+
+    return results
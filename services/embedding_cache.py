@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """
+    Cache key for a text query. CLIP's tokenizer already lowercases and
+    collapses whitespace, so "Black  Jeans" and "black jeans" embed identically.
+    """
+    return " ".join(text.split()).lower()
+
+
+class TextEmbeddingCache:
+    """
+    Bounded, thread-safe LRU of text -> embedding.
+
+    Optionally persisted to an .npz file (keys + stacked vectors) tagged with
+    the model/backend id, so a cache written by a different encoder is ignored.
+    """
+
+    def __init__(self, max_entries: int, path: Optional[str] = None, model_id: str = ""):
+        self.max_entries = max_entries
+        self.path = path
+        self.model_id = model_id
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, list]:
+        """Return cached embeddings for the keys that are present, marking them recently used."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def put_many(self, entries: Dict[str, list]):
+        with self._lock:
+            for key, embedding in entries.items():
+                self._entries[key] = embedding
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": bool(self.path)
+        }
+
+    def load(self):
+        """Load persisted entries (oldest first, so LRU order survives). No-op without a path."""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model_id"]) != self.model_id:
+                    print(f"Ignoring text embedding cache {self.path}: written by {data['model_id']}")
+                    return
+                entries = dict(zip(data["keys"].tolist(), data["vectors"].tolist()))
+            self.put_many(entries)
+            print(f"Loaded {len(entries)} text embeddings from {self.path}")
+        except Exception as e:
+            print(f"Failed to load text embedding cache {self.path}: {e}")
+
+    def save(self):
+        """Persist entries atomically. No-op without a path or when empty."""
+        if not self.path:
+            return
+
+        with self._lock:
+            keys = list(self._entries.keys())
+            vectors = list(self._entries.values())
+
+        if not keys:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    model_id=np.array(self.model_id),
+                    keys=np.array(keys),
+                    vectors=np.array(vectors, dtype=np.float32)
+                )
+            os.replace(tmp_path, self.path)
+            print(f"Saved {len(keys)} text embeddings to {self.path}")
+        except Exception as e:
+            print(f"Failed to save text embedding cache {self.path}: {e}")
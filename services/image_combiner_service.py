@@ -1,26 +1,140 @@
 from PIL import Image
 from io import BytesIO
-import requests
-from typing import List, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import hashlib
+import hmac
+import json
+import threading
+from typing import List, Dict, Optional
+
+from services.s3_service import upload_outfit_image, find_outfit_image, read_image_bytes, object_key_from_url
+from services.tile_cache import TileCache
+from config import (
+    COMBINER_FETCH_WORKERS, COMBINER_FETCH_FAILURE_POLICY,
+    COMBINER_CACHE_ENABLED, COMBINER_CACHE_SIZE,
+    COMBINER_TILE_CACHE_MB, COMBINER_TILE_CACHE_DIR, COMBINER_TILE_CACHE_DISK_MB,
+    COMBINER_MODE, OUTFIT_MANIFEST_SECRET, PUBLIC_API_URL
+)
+
+# Bump when the collage layout changes so earlier renders are not reused
+COMBINER_LAYOUT_VERSION = 1
+
+# /outfits/render is public, so a manifest may only ask for these canvas sizes and this many items
+MANIFEST_SIZES = (400, 800, 1200)
+MANIFEST_MAX_ITEMS = 12
+
+
+def check_manifest_config():
+    """Refuse to start in manifest mode without a signing secret and an absolute render URL base."""
+    if COMBINER_MODE != "manifest":
+        return
+    if not OUTFIT_MANIFEST_SECRET:
+        raise RuntimeError("COMBINER_MODE=manifest requires OUTFIT_MANIFEST_SECRET")
+    if not PUBLIC_API_URL:
+        raise RuntimeError("COMBINER_MODE=manifest requires PUBLIC_API_URL (render URLs must be absolute)")
+
+
+def _manifest_key() -> bytes:
+    if not OUTFIT_MANIFEST_SECRET:
+        raise ValueError("Outfit manifests are disabled: OUTFIT_MANIFEST_SECRET is not set")
+    return OUTFIT_MANIFEST_SECRET.encode("utf-8")
+
+
+# Shared across requests: one outfit's images are fetched concurrently
+_fetch_executor = ThreadPoolExecutor(max_workers=COMBINER_FETCH_WORKERS, thread_name_prefix="outfit-fetch")
+
+# Bump when tile resizing changes so cached tiles are not reused
+COMBINER_TILE_VERSION = 1
+
+# Decoded item images already resized for a slot, keyed by (URL, box)
+tile_cache = TileCache(
+    max_bytes=COMBINER_TILE_CACHE_MB * 1024 * 1024,
+    directory=COMBINER_TILE_CACHE_DIR or None,
+    max_disk_bytes=COMBINER_TILE_CACHE_DISK_MB * 1024 * 1024
+)
+
+# Render cache: cache key -> public URL of the uploaded collage (LRU)
+_rendered = OrderedDict()
+_rendered_lock = threading.Lock()
 
-from services.s3_service import upload_outfit_image
-from config import MINIO_ENDPOINT, MINIO_PUBLIC_URL, MINIO_SECURE
 
 class ImageCombinerService:
     @staticmethod
     def download_image(url: str) -> Image.Image:
-        """Download image from URL and return PIL Image."""
-        # Convert public URL to internal URL for Docker networking
-        protocol = "https" if MINIO_SECURE else "http"
-        public_prefix = f"{protocol}://{MINIO_PUBLIC_URL}/"
-        internal_prefix = f"{protocol}://{MINIO_ENDPOINT}/"
+        """Download image from URL (read directly from MinIO for our objects) and return PIL Image."""
+        return Image.open(BytesIO(read_image_bytes(url))).convert("RGBA")
+
+    @staticmethod
+    def get_tile(url: str, box: tuple) -> Image.Image:
+        """
+        The item image resized to fit box (width, height), from the tile cache.
+        Only a miss downloads and resizes the full-size original.
+        """
+        key = TileCache.make_key(COMBINER_TILE_VERSION, url, box[0], box[1])
+        tile = tile_cache.get(key)
+        if tile is None:
+            tile = ImageCombinerService.resize_contain(ImageCombinerService.download_image(url), box[0], box[1])
+            tile_cache.put(key, tile)
+        return tile
+
+    @staticmethod
+    def fetch_tiles(slots: List[Dict]) -> List[Optional[Image.Image]]:
+        """
+        Tiles for the slots, fetched concurrently, in input order.
+        A failed fetch is None with COMBINER_FETCH_FAILURE_POLICY=skip, and raises with "fail".
+        """
+        futures = [
+            _fetch_executor.submit(ImageCombinerService.get_tile, slot['item']['image_url'], slot['box'])
+            for slot in slots
+        ]
+
+        tiles = []
+        for slot, future in zip(slots, futures):
+            try:
+                tiles.append(future.result())
+            except Exception as e:
+                if COMBINER_FETCH_FAILURE_POLICY == "fail":
+                    raise
+                print(f"Failed to download image {slot['item']['image_url']}: {e}")
+                tiles.append(None)
+        return tiles
+
+    @staticmethod
+    def cache_key(items: List[Dict], size: int) -> str:
+        """
+        Content address of a render: the ordered (item id, image URL, category group)
+        tuples plus layout size and version. Replacing an item's image gives it a new
+        URL, so its collages get new keys and stale renders are never returned.
+        """
+        content = {
+            "version": COMBINER_LAYOUT_VERSION,
+            "size": size,
+            "items": [[str(item.get('id', '')), item['image_url'], item.get('categoryGroup', '')] for item in items]
+        }
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
 
-        internal_url = url
-        if url.startswith(public_prefix):
-            internal_url = url.replace(public_prefix, internal_prefix)
+    @staticmethod
+    def get_cached_render(key: str) -> Optional[str]:
+        """URL of an earlier render, from memory or (shared across workers) MinIO."""
+        with _rendered_lock:
+            if key in _rendered:
+                _rendered.move_to_end(key)
+                return _rendered[key]
+
+        url = find_outfit_image(key)
+        if url:
+            ImageCombinerService.remember_render(key, url)
+        return url
 
-        response = requests.get(internal_url)
-        return Image.open(BytesIO(response.content)).convert("RGBA")
+    @staticmethod
+    def remember_render(key: str, url: str):
+        with _rendered_lock:
+            _rendered[key] = url
+            _rendered.move_to_end(key)
+            while len(_rendered) > COMBINER_CACHE_SIZE:
+                _rendered.popitem(last=False)
 
     @staticmethod
     def resize_contain(img: Image.Image, target_width: int, target_height: int) -> Image.Image:
@@ -40,7 +154,104 @@ class ImageCombinerService:
         return img.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
     @staticmethod
-    def combine_outfit_images(items: List[Dict], size: int = 800) -> str:
+    def encode_manifest_token(items: List[Dict], size: int) -> str:
+        """Signed, URL-safe token carrying what is needed to render the outfit later."""
+        payload = json.dumps({
+            "v": COMBINER_LAYOUT_VERSION,
+            "s": size,
+            "i": [[str(item.get('id', '')), item['image_url'], item.get('categoryGroup', '')] for item in items]
+        }, separators=(",", ":")).encode("utf-8")
+
+        signature = hmac.new(_manifest_key(), payload, hashlib.sha256).digest()
+        return f"{base64.urlsafe_b64encode(payload).decode().rstrip('=')}.{base64.urlsafe_b64encode(signature).decode().rstrip('=')}"
+
+    @staticmethod
+    def decode_manifest_token(token: str) -> tuple:
+        """
+        Returns (items, size) from encode_manifest_token. Raises ValueError if
+        invalid or tampered with, or if it asks for a canvas size outside
+        MANIFEST_SIZES, too many items, or an image outside our bucket.
+        """
+        try:
+            encoded_payload, encoded_signature = token.split(".")
+            payload = base64.urlsafe_b64decode(encoded_payload + "=" * (-len(encoded_payload) % 4))
+            signature = base64.urlsafe_b64decode(encoded_signature + "=" * (-len(encoded_signature) % 4))
+        except (ValueError, TypeError):
+            raise ValueError("Malformed outfit manifest")
+
+        expected = hmac.new(_manifest_key(), payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(signature, expected):
+            raise ValueError("Invalid outfit manifest signature")
+
+        try:
+            data = json.loads(payload)
+            size = data["s"]
+            items = [{"id": item_id, "image_url": url, "categoryGroup": group} for item_id, url, group in data["i"]]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Malformed outfit manifest")
+
+        if size not in MANIFEST_SIZES:
+            raise ValueError(f"Unsupported outfit size {size}")
+        if len(items) > MANIFEST_MAX_ITEMS:
+            raise ValueError("Too many items in outfit manifest")
+        if any(not isinstance(item["image_url"], str) or object_key_from_url(item["image_url"]) is None for item in items):
+            raise ValueError("Outfit manifest references an image outside storage")
+
+        return items, size
+
+    @staticmethod
+    def build_manifest(items: List[Dict], size: int = 800) -> Dict:
+        """
+        The collage layout without rendering it: one slot per placed item with the
+        rectangle (canvas pixels) the image is fitted into, centered, keeping its
+        aspect ratio. render_url renders (and caches) the same collage on demand.
+        """
+        # Only our own stored images can be rendered from a manifest
+        items = [item for item in items if item.get('image_url') and object_key_from_url(item['image_url'])]
+        items = items[:MANIFEST_MAX_ITEMS]
+        slots = ImageCombinerService.layout_slots(items, size)
+
+        manifest_slots = []
+        for slot in slots:
+            area_x, area_y, area_width, area_height = slot['area']
+            box_width, box_height = slot['box']
+            manifest_slots.append({
+                "item_id": str(slot['item'].get('id', '')),
+                "image_url": slot['item']['image_url'],
+                "categoryGroup": slot['item'].get('categoryGroup', ''),
+                "x": area_x + (area_width - box_width) // 2,
+                "y": area_y + (area_height - box_height) // 2,
+                "width": box_width,
+                "height": box_height
+            })
+
+        token = ImageCombinerService.encode_manifest_token(items, size)
+        return {
+            "version": COMBINER_LAYOUT_VERSION,
+            "width": size,
+            "height": size,
+            "background": "#ffffff",
+            "slots": manifest_slots,
+            "render_url": f"{PUBLIC_API_URL}/outfits/render?manifest={token}"
+        }
+
+    @staticmethod
+    def combine_outfit(items: List[Dict], size: int = 800) -> Dict:
+        """
+        Outfit image fields for API responses, following COMBINER_MODE:
+        "image" renders and uploads the collage now; "manifest" returns the layout
+        and points combined_image_url at GET /outfits/render, which renders on first view.
+        """
+        if COMBINER_MODE == "manifest":
+            if not items:
+                return {"combined_image_url": None, "outfit_manifest": None}
+            manifest = ImageCombinerService.build_manifest(items, size)
+            return {"combined_image_url": manifest["render_url"], "outfit_manifest": manifest}
+
+        return {"combined_image_url": ImageCombinerService.combine_outfit_images(items, size), "outfit_manifest": None}
+
+    @staticmethod
+    def combine_outfit_images(items: List[Dict], size: int = 800, output: str = "image"):
         """
         Combine outfit images in a styled layout:
         - Upper wear: large, top-left
@@ -48,11 +259,70 @@ class ImageCombinerService:
         - Footwear: bottom-right
         - Accessories: stacked on right side (top area)
 
-        items should have 'image_url' and 'categoryGroup' keys
+        items should have 'image_url' and 'categoryGroup' keys.
+        Returns the uploaded collage URL, or with output="manifest" the layout
+        from build_manifest without downloading or rendering anything.
         """
         if not items:
             return None
 
+        if output == "manifest":
+            return ImageCombinerService.build_manifest(items, size)
+
+        items = [item for item in items if item.get('image_url')]
+
+        # Identical outfit rendered before: reuse it without downloading anything
+        cache_key = ImageCombinerService.cache_key(items, size) if COMBINER_CACHE_ENABLED else None
+        if cache_key:
+            cached_url = ImageCombinerService.get_cached_render(cache_key)
+            if cached_url:
+                return cached_url
+
+        slots = ImageCombinerService.layout_slots(items, size)
+        tiles = ImageCombinerService.fetch_tiles(slots)
+
+        # Items that failed to download are left out and the layout redone without them
+        failed_urls = {slot['item']['image_url'] for slot, tile in zip(slots, tiles) if tile is None}
+        if failed_urls:
+            # A collage missing items is not stored under the key
+            cache_key = None
+            items = [item for item in items if item['image_url'] not in failed_urls]
+            slots = ImageCombinerService.layout_slots(items, size)
+            tiles = ImageCombinerService.fetch_tiles(slots)
+
+        # Create canvas with white background
+        combined = Image.new('RGBA', (size, size), (255, 255, 255, 255))
+
+        for slot, tile in zip(slots, tiles):
+            if tile is None:
+                continue
+            area_x, area_y, area_width, area_height = slot['area']
+            x = area_x + (area_width - tile.width) // 2
+            y = area_y + (area_height - tile.height) // 2
+            combined.paste(tile, (x, y), tile if tile.mode == 'RGBA' else None)
+
+        # Convert to RGB for JPEG
+        combined_rgb = Image.new('RGB', combined.size, (255, 255, 255))
+        combined_rgb.paste(combined, mask=combined.split()[3] if combined.mode == 'RGBA' else None)
+
+        # Save to bytes
+        buffer = BytesIO()
+        combined_rgb.save(buffer, format='JPEG', quality=90)
+        buffer.seek(0)
+
+        # Upload to S3
+        url = upload_outfit_image(buffer, object_id=cache_key)
+        if cache_key:
+            ImageCombinerService.remember_render(cache_key, url)
+        return url
+
+    @staticmethod
+    def layout_slots(items: List[Dict], size: int) -> List[Dict]:
+        """
+        Place items on a size x size canvas. Each slot is
+        {"item", "box": (max width, max height), "area": (x, y, width, height)}:
+        the item image is resized to fit box and centered in area.
+        """
         # Group items by category
         upper_wear = []
         bottom_wear = []
@@ -61,30 +331,18 @@ class ImageCombinerService:
         accessories = []
 
         for item in items:
-            url = item.get('image_url')
             category_group = item.get('categoryGroup', '').lower()
 
-            if not url:
-                continue
-
-            try:
-                img = ImageCombinerService.download_image(url)
-                if 'upper' in category_group:
-                    upper_wear.append(img)
-                elif 'bottom' in category_group:
-                    bottom_wear.append(img)
-                elif 'foot' in category_group:
-                    footwear.append(img)
-                elif 'outer' in category_group:
-                    outer_wear.append(img)
-                else:
-                    accessories.append(img)
-            except Exception as e:
-                print(f"Failed to download image {url}: {e}")
-                continue
-
-        # Create canvas with white background
-        combined = Image.new('RGBA', (size, size), (255, 255, 255, 255))
+            if 'upper' in category_group:
+                upper_wear.append(item)
+            elif 'bottom' in category_group:
+                bottom_wear.append(item)
+            elif 'foot' in category_group:
+                footwear.append(item)
+            elif 'outer' in category_group:
+                outer_wear.append(item)
+            else:
+                accessories.append(item)
 
         # Layout dimensions
         left_width = int(size * 0.6)  # Left column 60%
@@ -98,42 +356,44 @@ class ImageCombinerService:
         footwear_size = int(size * 0.32)   # Medium size for footwear (increased)
         accessory_size = int(size * 0.22)  # Smallest size for accessories
 
+        slots = []
+
         # Place upper wear (top-left) - largest
         if upper_wear:
-            img = upper_wear[0]
-            resized = ImageCombinerService.resize_contain(img, main_item_size, main_item_size)
-            x = (left_width - resized.width) // 2
-            y = (upper_height - resized.height) // 2
-            combined.paste(resized, (x, y), resized if resized.mode == 'RGBA' else None)
+            slots.append({
+                'item': upper_wear[0],
+                'box': (main_item_size, main_item_size),
+                'area': (0, 0, left_width, upper_height)
+            })
 
         # Track outer wear height for accessories positioning
         outer_wear_area_height = 0
 
         # Place outer wear (top-right) - same size as upper wear
         if outer_wear:
-            img = outer_wear[0]
             outer_wear_area_height = int(size * 0.45)  # Top 45% of right side for outer wear
-            resized = ImageCombinerService.resize_contain(img, right_width - 10, main_item_size)
-            x = left_width + (right_width - resized.width) // 2
-            y = (outer_wear_area_height - resized.height) // 2
-            combined.paste(resized, (x, y), resized if resized.mode == 'RGBA' else None)
+            slots.append({
+                'item': outer_wear[0],
+                'box': (right_width - 10, main_item_size),
+                'area': (left_width, 0, right_width, outer_wear_area_height)
+            })
 
         # Place bottom wear (bottom-left) - same size as upper wear
         if bottom_wear:
-            img = bottom_wear[0]
-            resized = ImageCombinerService.resize_contain(img, main_item_size, main_item_size)
-            x = (left_width - resized.width) // 2
-            y = upper_height + (bottom_height - resized.height) // 2
-            combined.paste(resized, (x, y), resized if resized.mode == 'RGBA' else None)
+            slots.append({
+                'item': bottom_wear[0],
+                'box': (main_item_size, main_item_size),
+                'area': (0, upper_height, left_width, bottom_height)
+            })
 
         # Place footwear (bottom-right) - medium size
         if footwear:
-            img = footwear[0]
             foot_area_height = int(size * 0.32)
-            resized = ImageCombinerService.resize_contain(img, footwear_size, footwear_size)
-            x = left_width + (right_width - resized.width) // 2
-            y = size - foot_area_height + (foot_area_height - resized.height) // 2
-            combined.paste(resized, (x, y), resized if resized.mode == 'RGBA' else None)
+            slots.append({
+                'item': footwear[0],
+                'box': (footwear_size, footwear_size),
+                'area': (left_width, size - foot_area_height, right_width, foot_area_height)
+            })
 
         # Place accessories (stacked on right side, below outer wear if present) - smallest
         if accessories:
@@ -142,20 +402,11 @@ class ImageCombinerService:
             acc_area_height = size - foot_area_height - outer_wear_area_height
             acc_item_height = acc_area_height // max(len(accessories), 1)
 
-            for idx, img in enumerate(accessories[:3]):  # Max 3 accessories
-                resized = ImageCombinerService.resize_contain(img, accessory_size, accessory_size)
-                x = left_width + (right_width - resized.width) // 2
-                y = acc_start_y + idx * acc_item_height + (acc_item_height - resized.height) // 2
-                combined.paste(resized, (x, y), resized if resized.mode == 'RGBA' else None)
-
-        # Convert to RGB for JPEG
-        combined_rgb = Image.new('RGB', combined.size, (255, 255, 255))
-        combined_rgb.paste(combined, mask=combined.split()[3] if combined.mode == 'RGBA' else None)
+            for idx, item in enumerate(accessories[:3]):  # Max 3 accessories
+                slots.append({
+                    'item': item,
+                    'box': (accessory_size, accessory_size),
+                    'area': (left_width, acc_start_y + idx * acc_item_height, right_width, acc_item_height)
+                })
 
-        # Save to bytes
-        buffer = BytesIO()
-        combined_rgb.save(buffer, format='JPEG', quality=90)
-        buffer.seek(0)
-
-        # Upload to S3
-        return upload_outfit_image(buffer)
+        return slots
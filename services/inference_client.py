@@ -0,0 +1,159 @@
+"""
+Entry point for CLIP tagging, text embeddings and background removal.
+
+When INFERENCE_SERVER_URL is unset, calls run in-process through clip_service
+and background_removal_service (imported lazily). When it is set, calls go to
+inference_server.py over HTTP, which micro-batches concurrent requests, so API
+workers never load torch, CLIP or rembg and can scale to many processes.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import requests
+from PIL import Image
+
+from config import (
+    INFERENCE_SERVER_URL, INFERENCE_TIMEOUT, INFERENCE_CLIENT_CONCURRENCY
+)
+
+
+class ClipModelNotReadyError(Exception):
+    """Raised when the CLIP model is still loading (or failed to load) after waiting."""
+    pass
+
+
+_session = requests.Session()
+_remote_ready = False
+
+
+def is_remote() -> bool:
+    return bool(INFERENCE_SERVER_URL)
+
+
+def _post(path: str, **kwargs) -> requests.Response:
+    global _remote_ready
+
+    try:
+        response = _session.post(f"{INFERENCE_SERVER_URL}{path}", timeout=INFERENCE_TIMEOUT, **kwargs)
+    except requests.ConnectionError as e:
+        _remote_ready = False
+        raise ClipModelNotReadyError(f"Inference server unreachable: {e}")
+
+    if response.status_code == 503:
+        _remote_ready = False
+        raise ClipModelNotReadyError(response.json().get("detail", "Inference server not ready"))
+
+    response.raise_for_status()
+    return response
+
+
+def _raw_image_request(image: Image.Image) -> dict:
+    """Send decoded pixels as-is: no PNG encode here and no decode on the server."""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return {
+        "data": image.tobytes(),
+        "headers": {"X-Image-Format": "raw", "X-Image-Size": f"{image.width}x{image.height}"}
+    }
+
+
+def start_local_model():
+    """Start loading CLIP in the background when running in-process."""
+    if not is_remote():
+        from services.clip_service import clip_model_manager
+        clip_model_manager.start()
+
+
+def status() -> dict:
+    """CLIP model status, from the local manager or the inference server."""
+    if not is_remote():
+        from services.clip_service import clip_model_manager
+        return clip_model_manager.status()
+
+    try:
+        response = _session.get(f"{INFERENCE_SERVER_URL}/health", timeout=2)
+        response.raise_for_status()
+        return {**response.json()["clip_model"], "server": INFERENCE_SERVER_URL}
+    except (requests.RequestException, KeyError, ValueError) as e:
+        return {"state": "unreachable", "warm": False, "server": INFERENCE_SERVER_URL, "error": str(e)}
+
+
+def wait_until_ready(timeout: Optional[float] = None):
+    """Block until CLIP is warm, raising ClipModelNotReadyError after timeout."""
+    global _remote_ready
+
+    if not is_remote():
+        from services.clip_service import clip_model_manager
+        clip_model_manager.wait_until_ready(timeout=timeout)
+        return
+
+    if _remote_ready:
+        return
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        current = status()
+        if current["warm"]:
+            _remote_ready = True
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            raise ClipModelNotReadyError(f"CLIP model is {current['state']} on the inference server, please retry shortly")
+        time.sleep(0.5)
+
+
+def generate_tags(image) -> dict:
+    """Same contract as clip_service.generate_tags (PIL image, bytes, buffer or URL)."""
+    if not is_remote():
+        from services.clip_service import generate_tags as generate_tags_local
+        return generate_tags_local(image)
+
+    if isinstance(image, str):
+        return _post("/tag/url", json={"image_url": image}).json()
+    if isinstance(image, Image.Image):
+        return _post("/tag", **_raw_image_request(image)).json()
+    if hasattr(image, "read"):
+        image.seek(0)
+        image = image.read()
+    return _post("/tag", data=bytes(image), headers={"X-Image-Format": "encoded"}).json()
+
+
+def generate_tags_batch(images: List) -> List[dict]:
+    """
+    Same contract as clip_service.generate_tags_batch.
+    Remotely, the images are sent as concurrent requests and the server
+    micro-batches them into shared encode_image calls.
+    """
+    if not is_remote():
+        from services.clip_service import generate_tags_batch as generate_tags_batch_local
+        return generate_tags_batch_local(images)
+
+    if not images:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(INFERENCE_CLIENT_CONCURRENCY, len(images))) as executor:
+        return list(executor.map(generate_tags, images))
+
+
+def get_text_embedding(text: str) -> list:
+    """Same contract as clip_service.get_text_embedding."""
+    if not is_remote():
+        from services.clip_service import get_text_embedding as get_text_embedding_local
+        return get_text_embedding_local(text)
+
+    return _post("/embed/text", json={"text": text}).json()["embedding"]
+
+
+def remove_background_image(file) -> Image.Image:
+    """Same contract as background_removal_service.remove_background_image."""
+    if not is_remote():
+        from services.background_removal_service import remove_background_image as remove_background_local
+        return remove_background_local(file)
+
+    if hasattr(file, "read"):
+        file.seek(0)
+        file = file.read()
+
+    response = _post("/remove-background", data=bytes(file), headers={"Content-Type": "application/octet-stream"})
+    width, height = (int(v) for v in response.headers["X-Image-Size"].split("x"))
+    return Image.frombytes("RGB", (width, height), response.content)
@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple, Type
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submit() calls into batches for a batch function.
+
+    A worker thread takes the first queued item, then keeps collecting until
+    max_batch_size items are queued or max_wait_ms has passed since that first
+    item, and calls batch_fn once with the whole batch. batch_fn must return
+    one result per input, in order; each caller gets its own result through
+    the returned Future. If the batch call raises, its items are retried one
+    at a time, so a single bad input only fails its own caller. Exceptions of
+    a type in batch_errors (e.g. the model not being loaded) say nothing about
+    individual inputs, so they fail the whole batch at once instead.
+    """
+
+    def __init__(self, batch_fn: Callable[[List], List], max_batch_size: int, max_wait_ms: float, name: str,
+                 batch_errors: Tuple[Type[Exception], ...] = ()):
+        self.batch_fn = batch_fn
+        self.batch_errors = batch_errors
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            inputs = [item for item, _ in batch]
+
+            try:
+                results = self.batch_fn(inputs)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except self.batch_errors as e:
+                print(f"[{self.name}] Batch of {len(batch)} failed: {e}")
+                self.failed_batches += 1
+                for _, future in batch:
+                    future.set_exception(e)
+            except Exception as e:
+                print(f"[{self.name}] Batch of {len(batch)} failed, retrying items individually: {e}")
+                self.failed_batches += 1
+                for item, future in batch:
+                    self._run_single(item, future)
+
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def _run_single(self, item, future: Future):
+        try:
+            future.set_result(self.batch_fn([item])[0])
+        except Exception as e:
+            future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "failed_batches": self.failed_batches,
+            "queued": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
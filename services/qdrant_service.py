@@ -1,77 +1,477 @@
-from typing import List, Optional
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar, Union
+
+import grpc
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
 from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
 
-from config import QDRANT_HOST, QDRANT_PORT
+from config import (
+    QDRANT_HOST, QDRANT_PORT, QDRANT_GRPC_PORT, QDRANT_PREFER_GRPC, QDRANT_TIMEOUT, QDRANT_RETRIES,
+    QDRANT_QUANTIZATION, QDRANT_QUANTIZATION_QUANTILE, QDRANT_VECTORS_ON_DISK,
+    QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT, QDRANT_HNSW_EF, QDRANT_RESCORE, QDRANT_OVERSAMPLING,
+    QDRANT_MIGRATION_WRITE_WAIT, QDRANT_FREEZE_CHECK_SECONDS
+)
+
+
+# Alias the app reads and writes through; migrate_collection swaps it between
+# physical collections (wardrobe_embeddings_<timestamp>)
+COLLECTION_NAME = "wardrobe_embeddings_current"
+
+# Physical collection created before the alias existed; init_collection points the alias at it
+LEGACY_COLLECTION_NAME = "wardrobe_embeddings"
 
+# Exists (pointing at the source collection) during migrate_collection's final sync; writes wait for it
+WRITE_FREEZE_ALIAS = "wardrobe_embeddings_write_freeze"
 
-# Collection name for wardrobe embeddings
-COLLECTION_NAME = "wardrobe_embeddings"
+# Payload key stamped with a fresh id on every write, so a migration can find
+# points that changed after it copied them
+REVISION_KEY = "_rev"
 
 # CLIP embedding dimension (ViT-B/32)
 EMBEDDING_DIM = 512
 
 
+T = TypeVar("T")
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    return {
+        "host": QDRANT_HOST,
+        "port": QDRANT_PORT,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "timeout": QDRANT_TIMEOUT
+    }
+
+
 def get_qdrant_client() -> QdrantClient:
-    """Get Qdrant client instance for local Qdrant."""
-    return QdrantClient(
-        host=QDRANT_HOST,
-        port=QDRANT_PORT
+    """
+    Process-wide Qdrant client. It is thread-safe and keeps its HTTP / gRPC
+    connections open, so every call reuses them. Recreated after a fork,
+    since connections must not be shared between processes.
+    """
+    global _client, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = QdrantClient(**_client_options())
+                _client_pid = os.getpid()
+    return _client
+
+
+def _is_transient(error: Exception) -> bool:
+    """Connection failures, timeouts and 502/503/504s are worth retrying."""
+    if isinstance(error, ResponseHandlingException):
+        return True
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in (502, 503, 504)
+    if isinstance(error, grpc.RpcError):
+        return error.code() in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+    return False
+
+
+def with_retries(operation: Callable[[], T]) -> T:
+    """Run a Qdrant call, retrying transient failures up to QDRANT_RETRIES times with backoff."""
+    for attempt in range(QDRANT_RETRIES + 1):
+        try:
+            return operation()
+        except Exception as e:
+            if attempt == QDRANT_RETRIES or not _is_transient(e):
+                raise
+            print(f"  [QDRANT] Transient error ({e}), retry {attempt + 1}/{QDRANT_RETRIES}")
+            time.sleep(0.2 * 2 ** attempt)
+
+
+# Keyword payload indexes for filtering
+PAYLOAD_INDEX_FIELDS = ["user_id", "category_group", "category", "color", "occasion", "season"]
+
+# Applied to every vector search: HNSW ef, and rescoring of quantized candidates
+SEARCH_PARAMS = models.SearchParams(
+    hnsw_ef=QDRANT_HNSW_EF,
+    quantization=models.QuantizationSearchParams(
+        rescore=QDRANT_RESCORE,
+        oversampling=QDRANT_OVERSAMPLING
     )
+)
+
+
+def collection_config() -> dict:
+    """create_collection arguments for the configured vector layout."""
+    quantization_config = None
+    if QDRANT_QUANTIZATION == "scalar":
+        quantization_config = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=QDRANT_QUANTIZATION_QUANTILE,
+                always_ram=True
+            )
+        )
 
+    return {
+        "vectors_config": VectorParams(
+            size=EMBEDDING_DIM,
+            distance=Distance.COSINE,
+            on_disk=QDRANT_VECTORS_ON_DISK
+        ),
+        "hnsw_config": models.HnswConfigDiff(
+            m=QDRANT_HNSW_M,
+            ef_construct=QDRANT_HNSW_EF_CONSTRUCT
+        ),
+        "quantization_config": quantization_config
+    }
 
-def init_collection():
-    """Initialize Qdrant collection with proper indexing."""
+
+def _versioned_collection_name() -> str:
+    return f"{LEGACY_COLLECTION_NAME}_{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def _aliases() -> Dict[str, str]:
+    """{alias: collection} for every alias on the server."""
     client = get_qdrant_client()
+    aliases = with_retries(lambda: client.get_aliases()).aliases
+    return {alias.alias_name: alias.collection_name for alias in aliases}
 
-    collections = client.get_collections().collections
-    collection_names = [c.name for c in collections]
 
-    if COLLECTION_NAME not in collection_names:
-        client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(
-                size=EMBEDDING_DIM,
-                distance=Distance.COSINE
-            )
+def _create_alias(alias_name: str, collection_name: str):
+    client = get_qdrant_client()
+    client.update_collection_aliases(change_aliases_operations=[
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias_name)
         )
+    ])
 
-        # Create payload indexes for efficient filtering
-        client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="user_id",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
-        client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="category_group",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
-        client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="category",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
-        client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="color",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
-        client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="occasion",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
+
+def _delete_alias(alias_name: str):
+    client = get_qdrant_client()
+    client.update_collection_aliases(change_aliases_operations=[
+        models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias_name))
+    ])
+
+
+def resolve_collection() -> Optional[str]:
+    """Physical collection behind COLLECTION_NAME, or None before init_collection."""
+    return _aliases().get(COLLECTION_NAME)
+
+
+def create_collection(name: str):
+    """Create a collection with the configured layout and payload indexes."""
+    client = get_qdrant_client()
+
+    client.create_collection(collection_name=name, **collection_config())
+
+    # Create payload indexes for efficient filtering
+    for field_name in PAYLOAD_INDEX_FIELDS:
         client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="season",
+            collection_name=name,
+            field_name=field_name,
             field_schema=models.PayloadSchemaType.KEYWORD
         )
 
-        print(f"Created Qdrant collection: {COLLECTION_NAME}")
+
+def init_collection():
+    """
+    Point COLLECTION_NAME at the existing wardrobe_embeddings collection, or at
+    a new versioned collection on a fresh install.
+    """
+    client = get_qdrant_client()
+
+    current = resolve_collection()
+    if current is not None:
+        print(f"Qdrant collection {COLLECTION_NAME} already exists ({current})")
+        return
+
+    collection_names = [c.name for c in client.get_collections().collections]
+    created = None
+    if LEGACY_COLLECTION_NAME in collection_names:
+        name = LEGACY_COLLECTION_NAME
     else:
-        print(f"Qdrant collection {COLLECTION_NAME} already exists")
+        name = created = _versioned_collection_name()
+
+    try:
+        if created:
+            create_collection(created)
+        _create_alias(COLLECTION_NAME, name)
+    except Exception:
+        # Another worker initialized it first
+        current = resolve_collection()
+        if current is None:
+            raise
+        if created and created != current:
+            client.delete_collection(collection_name=created)
+        print(f"Qdrant collection {COLLECTION_NAME} already exists ({current})")
+        return
+
+    print(f"Qdrant collection {COLLECTION_NAME} -> {name}{' (created)' if created else ''}")
+
+
+_freeze_state = {"frozen": False, "checked_at": float("-inf")}
+_freeze_lock = threading.Lock()
+
+
+def _write_frozen(refresh: bool = False) -> bool:
+    """Whether a migration holds the write freeze, re-checked at most every QDRANT_FREEZE_CHECK_SECONDS."""
+    with _freeze_lock:
+        if not refresh and time.monotonic() - _freeze_state["checked_at"] < QDRANT_FREEZE_CHECK_SECONDS:
+            return _freeze_state["frozen"]
+
+    frozen = WRITE_FREEZE_ALIAS in _aliases()
+    with _freeze_lock:
+        _freeze_state.update(frozen=frozen, checked_at=time.monotonic())
+    return frozen
+
+
+def _wait_for_migration():
+    """Hold a write during a migration's final sync, so the new collection sees every write."""
+    if not _write_frozen():
+        return
+
+    deadline = time.monotonic() + QDRANT_MIGRATION_WRITE_WAIT
+    while _write_frozen(refresh=True):
+        if time.monotonic() > deadline:
+            raise TimeoutError("Qdrant collection migration in progress, write not applied")
+        time.sleep(0.5)
+
+
+def _write(operation: Callable[[], T]) -> T:
+    """Run a write to COLLECTION_NAME, re-checking the migration freeze before every attempt."""
+    def attempt():
+        _wait_for_migration()
+        return operation()
+
+    return with_retries(attempt)
+
+
+def _stamp(payload: dict) -> dict:
+    """payload with a new REVISION_KEY."""
+    return {**payload, REVISION_KEY: uuid.uuid4().hex}
+
+
+def _point_revisions(collection: str) -> Dict[str, Optional[str]]:
+    """{point id: revision} for every point, without vectors or other payload."""
+    client = get_qdrant_client()
+    revisions = {}
+
+    offset = None
+    while True:
+        points, offset = with_retries(lambda: client.scroll(
+            collection_name=collection,
+            limit=1024,
+            offset=offset,
+            with_payload=[REVISION_KEY],
+            with_vectors=False
+        ))
+        for point in points:
+            revisions[str(point.id)] = (point.payload or {}).get(REVISION_KEY)
+
+        if offset is None:
+            return revisions
+
+
+def _copy_points(source: str, target: str, batch_size: int, point_ids: Optional[List[str]] = None) -> int:
+    """
+    Copy points with vectors and payloads from source to target: all of them,
+    or only point_ids. Returns the number copied.
+    """
+    client = get_qdrant_client()
+    copied = 0
+
+    offset = None
+    start = 0
+    while True:
+        if point_ids is None:
+            points, offset = with_retries(lambda: client.scroll(
+                collection_name=source,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            ))
+        else:
+            batch_ids = point_ids[start:start + batch_size]
+            start += batch_size
+            points = with_retries(lambda: client.retrieve(
+                collection_name=source,
+                ids=batch_ids,
+                with_payload=True,
+                with_vectors=True
+            )) if batch_ids else []
+            offset = start if start < len(point_ids) else None
+
+        if points:
+            with_retries(lambda: client.upsert(
+                collection_name=target,
+                points=[
+                    PointStruct(id=point.id, vector=point.vector, payload=point.payload)
+                    for point in points
+                ],
+                wait=True
+            ))
+            copied += len(points)
+
+        if offset is None:
+            return copied
+
+
+def _sync_points(source: str, target: str, batch_size: int) -> dict:
+    """
+    Make target match source: copy points that are new or have a different
+    revision, delete points source no longer has.
+    """
+    client = get_qdrant_client()
+
+    source_revisions = _point_revisions(source)
+    target_revisions = _point_revisions(target)
+
+    changed = [
+        point_id for point_id, revision in source_revisions.items()
+        if point_id not in target_revisions or target_revisions[point_id] != revision
+    ]
+    removed = [point_id for point_id in target_revisions if point_id not in source_revisions]
+
+    copied = _copy_points(source, target, batch_size, point_ids=changed) if changed else 0
+    if removed:
+        with_retries(lambda: client.delete(
+            collection_name=target,
+            points_selector=models.PointIdsList(points=removed),
+            wait=True
+        ))
+
+    return {"copied": copied, "deleted": len(removed)}
+
+
+def release_write_freeze():
+    """Remove the write freeze left by an interrupted migration."""
+    if WRITE_FREEZE_ALIAS in _aliases():
+        _delete_alias(WRITE_FREEZE_ALIAS)
+        print(f"Released Qdrant write freeze ({WRITE_FREEZE_ALIAS})")
+
+
+def migrate_collection(batch_size: int = 256, keep_old: bool = False) -> dict:
+    """
+    Rebuild the collection behind COLLECTION_NAME into a new collection with
+    the configured layout, then swap the alias to it in one atomic operation.
+
+    The bulk copy and a first catch-up sync run while the app keeps reading
+    and writing the old collection. Only the final sync runs under the write
+    freeze (WRITE_FREEZE_ALIAS): once writes that missed the freeze have had
+    time to land, the revisions of both collections are compared and every
+    point changed or deleted since the copy is replayed, so the new collection
+    matches the old one exactly when the alias moves. Searches never pause.
+    """
+    client = get_qdrant_client()
+
+    source = resolve_collection()
+    if source is None:
+        raise ValueError(f"Qdrant collection {COLLECTION_NAME} does not exist")
+
+    # Two migrations must never run at once
+    if WRITE_FREEZE_ALIAS in _aliases():
+        raise RuntimeError(
+            f"{WRITE_FREEZE_ALIAS} already exists: another migration is running, "
+            "or one was interrupted (rerun with --release-freeze)"
+        )
+
+    target = _versioned_collection_name()
+    create_collection(target)
+
+    try:
+        print(f"Copying {source} -> {target}")
+        copied = _copy_points(source, target, batch_size)
+        caught_up = _sync_points(source, target, batch_size)
+    except Exception:
+        client.delete_collection(collection_name=target)
+        raise
+
+    try:
+        _create_alias(WRITE_FREEZE_ALIAS, source)
+    except Exception:
+        client.delete_collection(collection_name=target)
+        raise
+
+    try:
+        # A writer may use a cached "not frozen" for QDRANT_FREEZE_CHECK_SECONDS,
+        # then its attempt can take up to QDRANT_TIMEOUT to land
+        settle_seconds = QDRANT_FREEZE_CHECK_SECONDS + QDRANT_TIMEOUT + 1
+        print(f"Writes frozen, waiting {settle_seconds}s for in-flight writes")
+        time.sleep(settle_seconds)
+
+        final_sync = _sync_points(source, target, batch_size)
+
+        source_count = client.count(collection_name=source, exact=True).count
+        target_count = client.count(collection_name=target, exact=True).count
+        if source_count != target_count:
+            raise RuntimeError(f"{target} has {target_count} points but {source} has {source_count}")
+
+        # Atomic switch: both operations are applied together
+        client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=COLLECTION_NAME)),
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(collection_name=target, alias_name=COLLECTION_NAME)
+            )
+        ])
+    except Exception:
+        client.delete_collection(collection_name=target)
+        raise
+    finally:
+        _delete_alias(WRITE_FREEZE_ALIAS)
+
+    if not keep_old:
+        client.delete_collection(collection_name=source)
+
+    return {
+        "source": source,
+        "target": target,
+        "copied": copied,
+        "caught_up": caught_up,
+        "final_sync": final_sync,
+        "old_collection_kept": keep_old,
+        "config": {
+            "quantization": QDRANT_QUANTIZATION,
+            "vectors_on_disk": QDRANT_VECTORS_ON_DISK,
+            "hnsw_m": QDRANT_HNSW_M,
+            "hnsw_ef_construct": QDRANT_HNSW_EF_CONSTRUCT
+        }
+    }
+
+
+def build_payload(
+    item_id: str,
+    user_id: str,
+    category_group: str,
+    category: str,
+    attributes: dict,
+    image_url: str
+) -> dict:
+    """Build the Qdrant payload (tags flattened for filtering) for a wardrobe item."""
+    payload = {
+        "item_id": item_id,
+        "user_id": user_id,
+        "category_group": category_group,
+        "category": category,
+        "image_url": image_url,
+        "color": attributes.get("color", "Unknown"),
+        "pattern": attributes.get("pattern", "Unknown"),
+        "material": attributes.get("material", "Unknown"),
+        "season": attributes.get("season", "All Season"),
+        "occasion": attributes.get("occasion", "Casual"),
+    }
+
+    # Add any additional attributes
+    for key, value in attributes.items():
+        if key not in payload:
+            payload[key] = value
+
+    return payload
 
 
 def store_embedding(
@@ -98,23 +498,7 @@ def store_embedding(
     client = get_qdrant_client()
 
     # Build payload with tags for filtering
-    payload = {
-        "item_id": item_id,
-        "user_id": user_id,
-        "category_group": category_group,
-        "category": category,
-        "image_url": image_url,
-        "color": attributes.get("color", "Unknown"),
-        "pattern": attributes.get("pattern", "Unknown"),
-        "material": attributes.get("material", "Unknown"),
-        "season": attributes.get("season", "All Season"),
-        "occasion": attributes.get("occasion", "Casual"),
-    }
-
-    # Add any additional attributes
-    for key, value in attributes.items():
-        if key not in payload:
-            payload[key] = value
+    payload = _stamp(build_payload(item_id, user_id, category_group, category, attributes, image_url))
 
     point = PointStruct(
         id=item_id,
@@ -122,10 +506,83 @@ def store_embedding(
         payload=payload
     )
 
-    client.upsert(
+    _write(lambda: client.upsert(
         collection_name=COLLECTION_NAME,
         points=[point]
-    )
+    ))
+
+
+def store_embeddings(items: List[dict]):
+    """
+    Store many wardrobe item embeddings in one upsert.
+
+    Args:
+        items: [{"item_id", "user_id", "embedding", "category_group", "category",
+                 "attributes", "image_url"}], same fields as store_embedding
+    """
+    if not items:
+        return
+
+    client = get_qdrant_client()
+
+    points = [
+        PointStruct(
+            id=item["item_id"],
+            vector=item["embedding"],
+            payload=_stamp(build_payload(
+                item["item_id"], item["user_id"], item["category_group"],
+                item["category"], item["attributes"], item["image_url"]
+            ))
+        )
+        for item in items
+    ]
+
+    _write(lambda: client.upsert(
+        collection_name=COLLECTION_NAME,
+        points=points
+    ))
+
+
+def build_filter(
+    user_id: str,
+    category_group: Optional[str] = None,
+    category: Optional[str] = None,
+    color: Optional[str] = None,
+    occasion: Optional[str] = None,
+    season: Optional[str] = None,
+    exclude_item_id: Optional[str] = None
+) -> Filter:
+    """Filter on the user's items plus any given tag values, optionally leaving one item out."""
+    must_conditions = [
+        FieldCondition(key="user_id", match=MatchValue(value=user_id))
+    ]
+
+    for key, value in (
+        ("category_group", category_group),
+        ("category", category),
+        ("color", color),
+        ("occasion", occasion),
+        ("season", season)
+    ):
+        if value:
+            must_conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
+
+    must_not = [models.HasIdCondition(has_id=[exclude_item_id])] if exclude_item_id else None
+
+    return Filter(must=must_conditions, must_not=must_not)
+
+
+def _search_result(hit) -> dict:
+    return {
+        "item_id": hit.payload["item_id"],
+        "image_url": hit.payload["image_url"],
+        "category_group": hit.payload["category_group"],
+        "category": hit.payload["category"],
+        "color": hit.payload.get("color"),
+        "occasion": hit.payload.get("occasion"),
+        "season": hit.payload.get("season"),
+        "score": hit.score
+    }
 
 
 def search_similar(
@@ -157,61 +614,122 @@ def search_similar(
     print(f"  [QDRANT] search_similar called - user_id: {user_id}, category_group: {category_group}")
     client = get_qdrant_client()
 
-    # Build filter conditions
-    must_conditions = [
-        FieldCondition(key="user_id", match=MatchValue(value=user_id))
-    ]
+    search_filter = build_filter(user_id, category_group, category, color, occasion, season)
+    print(f"  [QDRANT] Filter conditions: {len(search_filter.must)} conditions")
 
-    if category_group:
-        must_conditions.append(
-            FieldCondition(key="category_group", match=MatchValue(value=category_group))
-        )
+    results = with_retries(lambda: client.query_points(
+        collection_name=COLLECTION_NAME,
+        query=query_embedding,
+        query_filter=search_filter,
+        search_params=SEARCH_PARAMS,
+        limit=limit
+    ))
+    print(f"  [QDRANT] Results count: {len(results.points)}")
 
-    if category:
-        must_conditions.append(
-            FieldCondition(key="category", match=MatchValue(value=category))
-        )
+    return [_search_result(hit) for hit in results.points]
 
-    if color:
-        must_conditions.append(
-            FieldCondition(key="color", match=MatchValue(value=color))
-        )
 
-    if occasion:
-        must_conditions.append(
-            FieldCondition(key="occasion", match=MatchValue(value=occasion))
-        )
+def _point_exists(item_id: str) -> bool:
+    client = get_qdrant_client()
+    points = with_retries(lambda: client.retrieve(
+        collection_name=COLLECTION_NAME,
+        ids=[item_id],
+        with_payload=False,
+        with_vectors=False
+    ))
+    return bool(points)
 
-    if season:
-        must_conditions.append(
-            FieldCondition(key="season", match=MatchValue(value=season))
-        )
 
-    search_filter = Filter(must=must_conditions)
-    print(f"  [QDRANT] Filter conditions: {len(must_conditions)} conditions")
+def search_similar_to_item(
+    user_id: str,
+    item_id: str,
+    category_group: Optional[str] = None,
+    category: Optional[str] = None,
+    color: Optional[str] = None,
+    occasion: Optional[str] = None,
+    season: Optional[str] = None,
+    limit: int = 5
+) -> Optional[List[dict]]:
+    """
+    search_similar using a stored item as the query. Qdrant looks the vector
+    up by point id, so it never travels to the API, and the item itself is
+    excluded by the filter.
+
+    Returns:
+        List of matching items with scores, or None if the item has no embedding
+    """
+    client = get_qdrant_client()
 
-    results = client.query_points(
-        collection_name=COLLECTION_NAME,
-        query=query_embedding,
-        query_filter=search_filter,
-        limit=limit
-    )
-    print(f"  [QDRANT] Results count: {len(results.points)}")
+    try:
+        results = with_retries(lambda: client.query_points(
+            collection_name=COLLECTION_NAME,
+            query=item_id,
+            query_filter=build_filter(
+                user_id, category_group, category, color, occasion, season, exclude_item_id=item_id
+            ),
+            search_params=SEARCH_PARAMS,
+            limit=limit
+        ))
+    except Exception:
+        if not _point_exists(item_id):
+            return None
+        raise
+
+    return [_search_result(hit) for hit in results.points]
+
+
+def search_similar_by_group(
+    user_id: str,
+    query: Union[List[float], str],
+    category_groups: List[str],
+    limit_per_group: int = 1
+) -> Optional[Dict[str, List[dict]]]:
+    """
+    Top limit_per_group matches in each category group, as a single batch
+    request (one filtered query per group) instead of one search_similar
+    round-trip per group.
 
-    return [
-        {
-            "item_id": hit.payload["item_id"],
-            "image_url": hit.payload["image_url"],
-            "category_group": hit.payload["category_group"],
-            "category": hit.payload["category"],
-            "color": hit.payload.get("color"),
-            "occasion": hit.payload.get("occasion"),
-            "season": hit.payload.get("season"),
-            "score": hit.score
-        }
-        for hit in results.points
+    Args:
+        query: CLIP embedding, or the id of a stored item to search by
+            (resolved by Qdrant and excluded from the results)
+
+    Returns:
+        {category_group: [results, best first]} for every requested group,
+        or None if query is an item id with no embedding
+    """
+    if not category_groups:
+        return {}
+
+    client = get_qdrant_client()
+    exclude_item_id = query if isinstance(query, str) else None
+
+    requests = [
+        models.QueryRequest(
+            query=query,
+            filter=build_filter(user_id, category_group, exclude_item_id=exclude_item_id),
+            params=SEARCH_PARAMS,
+            limit=limit_per_group,
+            with_payload=True
+        )
+        for category_group in category_groups
     ]
 
+    try:
+        responses = with_retries(lambda: client.query_batch_points(
+            collection_name=COLLECTION_NAME,
+            requests=requests
+        ))
+    except Exception:
+        if exclude_item_id and not _point_exists(exclude_item_id):
+            return None
+        raise
+    print(f"  [QDRANT] Grouped search over {len(category_groups)} category groups")
+
+    return {
+        category_group: [_search_result(hit) for hit in response.points]
+        for category_group, response in zip(category_groups, responses)
+    }
+
 
 def search_by_text(
     user_id: str,
@@ -239,14 +757,71 @@ def search_by_text(
     )
 
 
+def iter_embeddings(batch_size: int = 256, user_id: Optional[str] = None) -> Iterator[list]:
+    """
+    Scroll the whole collection (optionally one user's items) in batches.
+    Yields lists of points with payloads and vectors.
+    """
+    client = get_qdrant_client()
+
+    scroll_filter = None
+    if user_id:
+        scroll_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))])
+
+    offset = None
+    while True:
+        points, offset = with_retries(lambda: client.scroll(
+            collection_name=COLLECTION_NAME,
+            scroll_filter=scroll_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        ))
+        if points:
+            yield points
+        if offset is None:
+            break
+
+
+def overwrite_payloads(payloads: Dict[str, dict]):
+    """Replace the full payload of many points in a single request."""
+    if not payloads:
+        return
+
+    client = get_qdrant_client()
+    _write(lambda: client.batch_update_points(
+        collection_name=COLLECTION_NAME,
+        update_operations=[
+            models.OverwritePayloadOperation(
+                overwrite_payload=models.SetPayload(payload=_stamp(payload), points=[point_id])
+            )
+            for point_id, payload in payloads.items()
+        ]
+    ))
+
+
 def delete_embedding(item_id: str):
     """Delete embedding when wardrobe item is deleted."""
     client = get_qdrant_client()
 
-    client.delete(
+    _write(lambda: client.delete(
         collection_name=COLLECTION_NAME,
         points_selector=models.PointIdsList(points=[item_id])
-    )
+    ))
+
+
+def delete_embeddings(item_ids: List[str]):
+    """Delete many items' embeddings in one request."""
+    if not item_ids:
+        return
+
+    client = get_qdrant_client()
+
+    _write(lambda: client.delete(
+        collection_name=COLLECTION_NAME,
+        points_selector=models.PointIdsList(points=item_ids)
+    ))
 
 
 def get_items_by_tag(
@@ -271,30 +846,11 @@ def get_items_by_tag(
     """
     client = get_qdrant_client()
 
-    must_conditions = [
-        FieldCondition(key="user_id", match=MatchValue(value=user_id))
-    ]
-
-    if category_group:
-        must_conditions.append(
-            FieldCondition(key="category_group", match=MatchValue(value=category_group))
-        )
-
-    if category:
-        must_conditions.append(
-            FieldCondition(key="category", match=MatchValue(value=category))
-        )
-
-    if color:
-        must_conditions.append(
-            FieldCondition(key="color", match=MatchValue(value=color))
-        )
-
-    results, _ = client.scroll(
+    results, _ = with_retries(lambda: client.scroll(
         collection_name=COLLECTION_NAME,
-        scroll_filter=Filter(must=must_conditions),
+        scroll_filter=build_filter(user_id, category_group, category, color),
         limit=limit
-    )
+    ))
 
     return [
         {
@@ -106,8 +106,8 @@ Select categories that would make a complete, appropriate outfit for the occasio
         tags_data = WardrobeTagsRepository.get_by_user(user_id)
         tags_by_category = tags_data['tags_by_category']
 
-        # For each selected category, get a random item
-        result_items = []
+        # For each selected category, pick a random item
+        selected_item_ids = []
         for category in valid_categories:
             # Find which category_group this category belongs to
             item_id = None
@@ -120,26 +120,31 @@ Select categories that would make a complete, appropriate outfit for the occasio
                         break
 
             if item_id:
-                # Get the full item details
-                item = WardrobeRepository.get_by_id(item_id)
-                if item:
-                    result_items.append({
-                        "id": str(item["id"]),
-                        "image_url": item["image_url"],
-                        "categoryGroup": item["category_group"],
-                        "category": item["category"],
-                        "attributes": item["attributes"]
-                    })
+                selected_item_ids.append(item_id)
+
+        # Get the full item details in one query, in category order
+        items = WardrobeRepository.get_by_ids(selected_item_ids, user_id)
+        result_items = [
+            {
+                "id": str(item["id"]),
+                "image_url": item["image_url"],
+                "categoryGroup": item["category_group"],
+                "category": item["category"],
+                "attributes": item["attributes"]
+            }
+            for item in items.values()
+        ]
 
         # Combine all item images into a styled outfit layout
-        combined_image_url = ImageCombinerService.combine_outfit_images(result_items)
+        outfit = ImageCombinerService.combine_outfit(result_items)
 
         return {
             "success": True,
             "prompt": prompt,
             "reasoning": recommendation.reasoning,
             "selected_categories": valid_categories,
-            "combined_image_url": combined_image_url,
+            "combined_image_url": outfit["combined_image_url"],
+            "outfit_manifest": outfit["outfit_manifest"],
             "items": result_items,
             "weather": weather_data
         }
@@ -0,0 +1,81 @@
+from typing import Optional
+
+from repositories.wardrobe_repository import WardrobeRepository
+from repositories.wardrobe_tags_repository import WardrobeTagsRepository
+from services.clip_service import generate_tags_from_embeddings
+from services.qdrant_service import iter_embeddings, build_payload, overwrite_payloads, REVISION_KEY
+
+
+class RetagService:
+
+    @staticmethod
+    def retag_wardrobe(batch_size: int = 256, user_id: Optional[str] = None, dry_run: bool = False) -> dict:
+        """
+        Re-score every stored embedding against the current label set.
+
+        Scrolls wardrobe_embeddings in batches and re-tags each batch with one
+        matmul (no image downloads, no image encoder). Only items whose tags
+        changed are written: one bulk UPDATE of wardrobe_items, one rebuild of
+        the affected users' wardrobe_tags trees and one Qdrant payload batch
+        per scroll batch.
+
+        Returns counts of scanned, changed and updated items.
+        """
+        stats = {"scanned": 0, "changed": 0, "updated": 0, "missing_in_db": 0, "users": 0}
+        touched_users = set()
+
+        for points in iter_embeddings(batch_size=batch_size, user_id=user_id):
+            tags_list = generate_tags_from_embeddings([point.vector for point in points])
+            stats["scanned"] += len(points)
+
+            changed = []
+            for point, tags in zip(points, tags_list):
+                payload = build_payload(
+                    item_id=point.payload["item_id"],
+                    user_id=point.payload["user_id"],
+                    category_group=tags["categoryGroup"],
+                    category=tags["category"],
+                    attributes=tags["attributes"],
+                    image_url=point.payload["image_url"]
+                )
+                stored = {key: value for key, value in point.payload.items() if key != REVISION_KEY}
+                if payload != stored:
+                    changed.append((point, tags))
+
+            stats["changed"] += len(changed)
+            if dry_run or not changed:
+                continue
+
+            updated = WardrobeRepository.bulk_update_tags([
+                {
+                    "id": point.payload["item_id"],
+                    "category_group": tags["categoryGroup"],
+                    "category": tags["category"],
+                    "attributes": tags["attributes"]
+                }
+                for point, tags in changed
+            ])
+            stats["updated"] += len(updated)
+            stats["missing_in_db"] += len(changed) - len(updated)
+
+            # Rebuild payloads from the DB rows so image_url/user_id are authoritative
+            overwrite_payloads({
+                str(item["id"]): build_payload(
+                    item_id=str(item["id"]),
+                    user_id=str(item["user_id"]),
+                    category_group=item["category_group"],
+                    category=item["category"],
+                    attributes=item["attributes"],
+                    image_url=item["image_url"]
+                )
+                for item in updated
+            })
+
+            batch_users = {str(item["user_id"]) for item in updated}
+            WardrobeTagsRepository.rebuild_for_users(list(batch_users))
+            touched_users |= batch_users
+
+            print(f"[RETAG] scanned={stats['scanned']} changed={stats['changed']} updated={stats['updated']}")
+
+        stats["users"] = len(touched_users)
+        return stats
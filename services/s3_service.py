@@ -1,9 +1,19 @@
 from minio import Minio
 from minio.error import S3Error
-from config import MINIO_ENDPOINT, MINIO_PUBLIC_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, MINIO_BUCKET_NAME, MINIO_SECURE
+from config import (
+    MINIO_ENDPOINT, MINIO_PUBLIC_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, MINIO_BUCKET_NAME, MINIO_SECURE,
+    STORAGE_READ_TIMEOUT, STORAGE_READ_RETRIES, STORAGE_READ_POOL_SIZE, STORAGE_READ_CACHE_MB
+)
 import uuid
 import json
+import threading
+from collections import OrderedDict
+from typing import Optional
 from io import BytesIO
+from urllib.parse import unquote
+
+import requests
+import urllib3
 
 # Initialize MinIO client
 minio_client = Minio(
@@ -39,12 +49,141 @@ policy = {
 minio_client.set_bucket_policy(MINIO_BUCKET_NAME, json.dumps(policy))
 print(f"Set public read policy on bucket: {MINIO_BUCKET_NAME}")
 
+# Separate client for internal reads: pooled keep-alive connections to
+# MINIO_ENDPOINT with short timeouts, instead of HTTP through the public URL
+read_client = Minio(
+    MINIO_ENDPOINT,
+    access_key=MINIO_ACCESS_KEY,
+    secret_key=MINIO_SECRET_KEY,
+    secure=MINIO_SECURE,
+    http_client=urllib3.PoolManager(
+        maxsize=STORAGE_READ_POOL_SIZE,
+        timeout=urllib3.Timeout(connect=STORAGE_READ_TIMEOUT, read=STORAGE_READ_TIMEOUT),
+        retries=urllib3.Retry(total=STORAGE_READ_RETRIES, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+    )
+)
+
+# Only for URLs outside our bucket (e.g. legacy Cloudinary images)
+_http = requests.Session()
+
+
+class ObjectCache:
+    """Thread-safe LRU of object bytes, bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        # Objects larger than a quarter of the cache would just evict everything else
+        if len(data) > self.max_bytes // 4:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._bytes += len(data)
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def discard(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+object_cache = ObjectCache(STORAGE_READ_CACHE_MB * 1024 * 1024)
+
 
-def upload_image(file, folder: str = "wearwhat/wardrobe") -> str:
-    """Upload image to MinIO and return public URL."""
+def object_key_from_url(url: str) -> Optional[str]:
+    """
+    Object key for a URL pointing into our bucket, through either the public
+    URL or the internal endpoint. None for any other URL.
+    """
+    for host in (MINIO_PUBLIC_URL, MINIO_ENDPOINT):
+        for protocol in ("https", "http"):
+            prefix = f"{protocol}://{host}/{MINIO_BUCKET_NAME}/"
+            if url.startswith(prefix):
+                return unquote(url[len(prefix):].split("?", 1)[0])
+    return None
+
+
+def read_object(object_name: str) -> bytes:
+    """Read an object's bytes through the MinIO client, served from the byte cache when recent."""
+    data = object_cache.get(object_name)
+    if data is not None:
+        return data
+
+    response = read_client.get_object(MINIO_BUCKET_NAME, object_name)
+    try:
+        data = response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+    object_cache.put(object_name, data)
+    return data
+
+
+def read_image_bytes(image_url: str) -> bytes:
+    """
+    Bytes of an image referenced by URL. Our own objects are read directly
+    from MinIO (cached); other URLs fall back to an HTTP GET.
+    """
+    object_name = object_key_from_url(image_url)
+    if object_name:
+        return read_object(object_name)
+
+    response = _http.get(image_url, timeout=STORAGE_READ_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def public_url(object_name: str) -> str:
+    """Public (browser-facing) URL of an object in the bucket."""
+    protocol = "https" if MINIO_SECURE else "http"
+    return f"{protocol}://{MINIO_PUBLIC_URL}/{MINIO_BUCKET_NAME}/{object_name}"
+
+
+def object_exists(object_name: str) -> bool:
+    try:
+        minio_client.stat_object(MINIO_BUCKET_NAME, object_name)
+        return True
+    except S3Error:
+        return False
+
+
+def upload_image(file, folder: str = "wearwhat/wardrobe", object_id: str = None) -> str:
+    """Upload image to MinIO and return public URL. object_id names the file (default: random UUID)."""
     # Generate unique filename
     file_extension = "png"
-    filename = f"{folder}/{uuid.uuid4()}.{file_extension}"
+    filename = f"{folder}/{object_id or uuid.uuid4()}.{file_extension}"
 
     # Handle both file objects and BytesIO
     if hasattr(file, 'read'):
@@ -74,9 +213,7 @@ def upload_image(file, folder: str = "wearwhat/wardrobe") -> str:
     )
 
     # Return public URL (use MINIO_PUBLIC_URL for browser access)
-    protocol = "https" if MINIO_SECURE else "http"
-    url = f"{protocol}://{MINIO_PUBLIC_URL}/{MINIO_BUCKET_NAME}/{filename}"
-    return url
+    return public_url(filename)
 
 
 def upload_profile_image(file) -> str:
@@ -84,9 +221,15 @@ def upload_profile_image(file) -> str:
     return upload_image(file, folder="wearwhat/profiles")
 
 
-def upload_outfit_image(file) -> str:
+def upload_outfit_image(file, object_id: str = None) -> str:
     """Upload combined outfit image to S3."""
-    return upload_image(file, folder="outfit_recommendations")
+    return upload_image(file, folder="outfit_recommendations", object_id=object_id)
+
+
+def find_outfit_image(object_id: str) -> Optional[str]:
+    """Public URL of a previously uploaded outfit image, or None if it does not exist."""
+    object_name = f"outfit_recommendations/{object_id}.png"
+    return public_url(object_name) if object_exists(object_name) else None
 
 
 def upload_studio_image(file) -> str:
@@ -116,6 +259,7 @@ def delete_image(image_url: str) -> bool:
         if image_url.startswith(prefix):
             object_name = image_url[len(prefix):]
             minio_client.remove_object(MINIO_BUCKET_NAME, object_name)
+            object_cache.discard(object_name)
             print(f"Deleted from MinIO: {object_name}")
             return True
         else:
@@ -124,6 +268,7 @@ def delete_image(image_url: str) -> bool:
             if bucket_marker in image_url:
                 object_name = image_url.split(bucket_marker, 1)[1]
                 minio_client.remove_object(MINIO_BUCKET_NAME, object_name)
+                object_cache.discard(object_name)
                 print(f"Deleted from MinIO (alt): {object_name}")
                 return True
 
@@ -1,7 +1,7 @@
 from typing import List, Dict, Optional
 
 from repositories.wardrobe_repository import WardrobeRepository
-from services.qdrant_service import get_qdrant_client, COLLECTION_NAME, search_similar
+from services.qdrant_service import search_similar_by_group
 from services.image_combiner_service import ImageCombinerService
 
 
@@ -48,29 +48,26 @@ class StylingService:
             print(f"[DEBUG] ERROR: Unauthorized - item user_id: {source_item['user_id']}, request user_id: {user_id}")
             return {"success": False, "message": "Unauthorized"}
 
-        # Get source item embedding from Qdrant
-        client = get_qdrant_client()
-        print(f"[DEBUG] Retrieving embedding from Qdrant for item_id: {item_id}")
-        points = client.retrieve(
-            collection_name=COLLECTION_NAME,
-            ids=[item_id],
-            with_vectors=True
-        )
-        print(f"[DEBUG] Points retrieved from Qdrant: {len(points) if points else 0}")
-
-        if not points:
-            print("[DEBUG] ERROR: No embedding found in Qdrant")
-            return {"success": False, "message": "Item embedding not found. Please re-upload the item."}
-
-        source_embedding = points[0].vector
         source_category_group = source_item["category_group"]
         print(f"[DEBUG] Source category_group: {source_category_group}")
-        print(f"[DEBUG] Embedding length: {len(source_embedding)}")
 
         # Get category groups to match
         categories_to_match = CATEGORY_GROUP_MATCHES.get(source_category_group, [])
         print(f"[DEBUG] Categories to match: {categories_to_match}")
 
+        # Best matching item from every category group in one Qdrant request,
+        # searching by the source item's id so its embedding stays in Qdrant
+        results_by_group = search_similar_by_group(
+            user_id=user_id,
+            query=item_id,
+            category_groups=categories_to_match,
+            limit_per_group=1
+        )
+
+        if results_by_group is None:
+            print("[DEBUG] ERROR: No embedding found in Qdrant")
+            return {"success": False, "message": "Item embedding not found. Please re-upload the item."}
+
         # Find best matching item from each category group
         matched_items = []
 
@@ -85,21 +82,19 @@ class StylingService:
             "match_score": 1.0
         })
 
+        # Full details of every best match in one database query
+        items = WardrobeRepository.get_by_ids(
+            [results[0]["item_id"] for results in results_by_group.values() if results],
+            user_id
+        )
+
         for category_group in categories_to_match:
-            print(f"\n[DEBUG] Searching for category_group: {category_group}")
-            # Search for best matching item in this category group
-            results = search_similar(
-                user_id=user_id,
-                query_embedding=source_embedding,
-                category_group=category_group,
-                limit=1
-            )
+            results = results_by_group.get(category_group, [])
             print(f"[DEBUG] Results for {category_group}: {results}")
 
             if results:
                 best_match = results[0]
-                # Get full item details from database
-                item = WardrobeRepository.get_by_id(best_match["item_id"])
+                item = items.get(best_match["item_id"])
                 print(f"[DEBUG] Best match item from DB: {item}")
                 if item:
                     matched_items.append({
@@ -118,8 +113,8 @@ class StylingService:
         print(f"\n[DEBUG] Total matched items: {len(matched_items)}")
         print(f"[DEBUG] Matched items summary: {[{'id': m['id'], 'categoryGroup': m['categoryGroup']} for m in matched_items]}")
 
-        combined_image_url = ImageCombinerService.combine_outfit_images(matched_items)
-        print(f"[DEBUG] Combined image URL: {combined_image_url}")
+        outfit = ImageCombinerService.combine_outfit(matched_items)
+        print(f"[DEBUG] Combined image URL: {outfit['combined_image_url']}")
         print(f"{'='*50}\n")
 
         return {
@@ -130,7 +125,8 @@ class StylingService:
                 "categoryGroup": source_item["category_group"],
                 "category": source_item["category"]
             },
-            "combined_image_url": combined_image_url,
+            "combined_image_url": outfit["combined_image_url"],
+            "outfit_manifest": outfit["outfit_manifest"],
             "matched_items": matched_items,
             "total_items": len(matched_items)
         }
@@ -163,18 +159,6 @@ class StylingService:
         if str(source_item["user_id"]) != user_id:
             return {"success": False, "message": "Unauthorized"}
 
-        # Get source embedding
-        client = get_qdrant_client()
-        points = client.retrieve(
-            collection_name=COLLECTION_NAME,
-            ids=[item_id],
-            with_vectors=True
-        )
-
-        if not points:
-            return {"success": False, "message": "Item embedding not found"}
-
-        source_embedding = points[0].vector
         source_category_group = source_item["category_group"]
 
         # Determine which categories to match
@@ -183,20 +167,30 @@ class StylingService:
         else:
             categories_to_match = CATEGORY_GROUP_MATCHES.get(source_category_group, [])
 
-        # Find matching items for each category
+        # Find matching items for each category, searching by the source item's id
+        results_by_group = search_similar_by_group(
+            user_id=user_id,
+            query=item_id,
+            category_groups=categories_to_match,
+            limit_per_group=limit_per_category
+        )
+
+        if results_by_group is None:
+            return {"success": False, "message": "Item embedding not found"}
+
+        items = WardrobeRepository.get_by_ids(
+            [result["item_id"] for results in results_by_group.values() for result in results],
+            user_id
+        )
+
         matches_by_category = {}
 
         for category_group in categories_to_match:
-            results = search_similar(
-                user_id=user_id,
-                query_embedding=source_embedding,
-                category_group=category_group,
-                limit=limit_per_category
-            )
+            results = results_by_group.get(category_group, [])
 
             category_matches = []
             for result in results:
-                item = WardrobeRepository.get_by_id(result["item_id"])
+                item = items.get(result["item_id"])
                 if item:
                     category_matches.append({
                         "id": str(item["id"]),
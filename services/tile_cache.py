@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PIL import Image
+
+
+class TileCache:
+    """
+    Two-level LRU of decoded, pre-downscaled RGBA tiles.
+
+    Memory holds up to max_bytes of pixels; every tile is also written as a
+    PNG under directory (when set), which is trimmed back to max_disk_bytes
+    by least-recent use, so tiles survive restarts and are shared by workers.
+    """
+
+    def __init__(self, max_bytes: int, directory: Optional[str] = None, max_disk_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._tiles = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get(self, key: str) -> Optional[Image.Image]:
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                self.memory_hits += 1
+                return self._tiles[key]
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                with Image.open(path) as f:
+                    tile = f.convert("RGBA")
+                os.utime(path)  # Mark recently used for disk trimming
+            except (OSError, ValueError):
+                tile = None
+
+            if tile is not None:
+                self.disk_hits += 1
+                self._remember(key, tile)
+                return tile
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, tile: Image.Image):
+        self._remember(key, tile)
+
+        if not self.directory:
+            return
+
+        try:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            tile.save(tmp_path, format="PNG", compress_level=1)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Failed to write tile {key}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            trim = self.max_disk_bytes and self._writes % 100 == 0
+        if trim:
+            self._trim_disk()
+
+    def _remember(self, key: str, tile: Image.Image):
+        size = tile.width * tile.height * 4
+        with self._lock:
+            if key in self._tiles:
+                return
+            self._tiles[key] = tile
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self._bytes -= evicted.width * evicted.height * 4
+
+    def _trim_disk(self):
+        """Remove least recently used tile files until the directory fits max_disk_bytes."""
+        try:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "tiles": len(self._tiles),
+            "memory_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "persistent": bool(self.directory)
+        }
@@ -1,5 +1,5 @@
 from uuid import UUID
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from repositories.wardrobe_tags_repository import WardrobeTagsRepository
 
 class WardrobeTagsService:
@@ -12,6 +12,11 @@ class WardrobeTagsService:
         """Add a wardrobe item to the tags tree."""
         return WardrobeTagsRepository.add_item_to_tag(user_id, category_group, category, item_id)
 
+    @staticmethod
+    def add_items_to_tags(user_id: UUID, items: List[dict]) -> dict:
+        """Add many wardrobe items to the tags tree in one update. Used by batch uploads."""
+        return WardrobeTagsRepository.add_items_to_tags(user_id, items)
+
     @staticmethod
     def remove_item(user_id: UUID, item_id: str) -> Optional[dict]:
         """Remove a wardrobe item from all tags. Used when deleting an item."""
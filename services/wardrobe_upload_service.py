@@ -0,0 +1,370 @@
+"""
+Background processing of wardrobe uploads.
+
+The upload endpoint only spools the raw file to UPLOAD_SPOOL_DIR and records a
+pending job; a pool of UPLOAD_WORKERS threads then runs the stages below, so
+several uploads are in flight at once (one in background removal while
+another is being tagged). Each stage's progress is written to
+wardrobe_upload_jobs for GET /wardrobe/jobs/{id}. The job id doubles as the
+id of the wardrobe item it creates.
+
+Batch uploads (upload_batch) are processed synchronously instead, with
+background removal fanned out over a bounded pool, one batched CLIP call per
+chunk and one bulk write per chunk to Postgres, Qdrant and wardrobe_tags.
+"""
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Tuple
+from uuid import UUID
+
+from config import (
+    UPLOAD_WORKERS, UPLOAD_SPOOL_DIR, UPLOAD_CLIP_WAIT_TIMEOUT, UPLOAD_STALE_JOB_SECONDS,
+    UPLOAD_STALE_SWEEP_SECONDS,
+    UPLOAD_BATCH_CONCURRENCY, UPLOAD_BATCH_CHUNK_SIZE
+)
+from services.s3_service import upload_image, delete_image
+from services.inference_client import (
+    generate_tags, generate_tags_batch, remove_background_image, wait_until_ready
+)
+from services.background_removal_service import encode_png
+from services.wardrobe_tags_service import WardrobeTagsService
+from services.qdrant_service import store_embedding, store_embeddings, delete_embeddings
+from repositories.wardrobe_repository import WardrobeRepository
+from repositories.upload_job_repository import UploadJobRepository
+
+UPLOAD_STAGES = [
+    "remove_background",
+    "upload_image",
+    "generate_tags",
+    "save_item",
+    "update_tags",
+    "store_embedding"
+]
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="wardrobe-upload")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _spool_path(job_id: str) -> str:
+    return os.path.join(UPLOAD_SPOOL_DIR, str(job_id))
+
+
+def _sweep_stale_jobs():
+    try:
+        WardrobeUploadService.recover_stale()
+    except Exception as e:
+        print(f"Stale upload job sweep failed: {e}")
+    finally:
+        _schedule_stale_sweep()
+
+
+def _schedule_stale_sweep():
+    """Run recover_stale on the upload executor after UPLOAD_STALE_SWEEP_SECONDS."""
+    timer = threading.Timer(UPLOAD_STALE_SWEEP_SECONDS, lambda: _executor.submit(_sweep_stale_jobs))
+    timer.daemon = True
+    timer.start()
+
+
+@contextmanager
+def _stage(job_id: str, name: str):
+    """Record a stage as running, then completed (with its duration) or failed."""
+    state = {"status": "running", "started_at": _now()}
+    UploadJobRepository.update_stage(job_id, name, state)
+    started = time.perf_counter()
+
+    try:
+        yield
+    except Exception as e:
+        state.update(status="failed", finished_at=_now(), error=str(e))
+        UploadJobRepository.update_stage(job_id, name, state)
+        raise
+
+    state.update(
+        status="completed",
+        finished_at=_now(),
+        duration_ms=round((time.perf_counter() - started) * 1000)
+    )
+    UploadJobRepository.update_stage(job_id, name, state)
+
+
+class WardrobeUploadService:
+
+    @staticmethod
+    def submit(user_id: UUID, file) -> dict:
+        """Spool the raw upload, create a pending job and queue it. Returns the job row."""
+        job_id = str(uuid.uuid4())
+
+        os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+        with open(_spool_path(job_id), "wb") as f:
+            shutil.copyfileobj(file, f)
+
+        job = UploadJobRepository.create(
+            job_id=job_id,
+            user_id=user_id,
+            stages={stage: {"status": "pending"} for stage in UPLOAD_STAGES}
+        )
+        _executor.submit(WardrobeUploadService.process, job_id)
+        return job
+
+    @staticmethod
+    def resume_pending():
+        """
+        Re-queue jobs left pending by a restart (claim() keeps workers from running
+        one twice), then sweep for stale processing jobs every UPLOAD_STALE_SWEEP_SECONDS.
+        """
+        WardrobeUploadService.recover_stale()
+
+        job_ids = UploadJobRepository.get_pending_ids()
+        for job_id in job_ids:
+            _executor.submit(WardrobeUploadService.process, job_id)
+        if job_ids:
+            print(f"Resumed {len(job_ids)} pending upload job(s)")
+
+        _schedule_stale_sweep()
+
+    @staticmethod
+    def recover_stale():
+        """
+        Jobs stuck in processing (their worker died) for UPLOAD_STALE_JOB_SECONDS are
+        re-queued if their spooled file is still there, and failed otherwise.
+        """
+        for job_id in UploadJobRepository.get_stale_processing_ids(UPLOAD_STALE_JOB_SECONDS):
+            if os.path.exists(_spool_path(job_id)):
+                if UploadJobRepository.requeue_stale(job_id, UPLOAD_STALE_JOB_SECONDS):
+                    print(f"Re-queued stale upload job {job_id}")
+                    _executor.submit(WardrobeUploadService.process, job_id)
+            elif UploadJobRepository.fail_stale(
+                job_id, UPLOAD_STALE_JOB_SECONDS, "Upload was interrupted and its file is no longer available"
+            ):
+                print(f"Failed stale upload job {job_id}: spooled file missing")
+
+    @staticmethod
+    def process(job_id: str):
+        job = UploadJobRepository.claim(job_id)
+        if job is None:
+            return
+
+        path = _spool_path(job_id)
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError("Uploaded file is no longer available")
+
+            item = WardrobeUploadService._run_stages(job_id, job["user_id"], path)
+            UploadJobRepository.complete(job_id, item)
+        except Exception as e:
+            print(f"Upload job {job_id} failed: {e}")
+            UploadJobRepository.fail(job_id, str(e))
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def upload_batch(user_id: UUID, files: List[Tuple[str, object]]) -> List[dict]:
+        """
+        Process many uploads in one call. files: [(filename, file object)].
+        Returns one result per file, in order: {"filename", "success", "item"} or
+        {"filename", "success": False, "error"}. A file that fails does not fail the batch.
+        """
+        results = [{"filename": filename, "success": False} for filename, _ in files]
+
+        # Only UPLOAD_BATCH_CHUNK_SIZE processed images are alive at a time
+        with ThreadPoolExecutor(max_workers=UPLOAD_BATCH_CONCURRENCY) as executor:
+            for start in range(0, len(files), UPLOAD_BATCH_CHUNK_SIZE):
+                chunk = list(enumerate(files[start:start + UPLOAD_BATCH_CHUNK_SIZE], start))
+                futures = [
+                    (index, executor.submit(WardrobeUploadService._prepare_image, file))
+                    for index, (_, file) in chunk
+                ]
+
+                images, image_urls, indexes = [], [], []
+                for index, future in futures:
+                    try:
+                        image, image_url = future.result()
+                    except Exception as e:
+                        print(f"Batch upload of {results[index]['filename']} failed: {e}")
+                        results[index]["error"] = str(e)
+                        continue
+                    images.append(image)
+                    image_urls.append(image_url)
+                    indexes.append(index)
+
+                if not images:
+                    continue
+
+                try:
+                    tags_list = generate_tags_batch(images)
+                    # One INSERT, one Qdrant upsert and one wardrobe_tags update per chunk
+                    items = WardrobeUploadService._persist_chunk(user_id, image_urls, tags_list)
+                except Exception as e:
+                    print(f"Batch chunk of {len(indexes)} file(s) failed: {e}")
+                    for image_url in image_urls:
+                        delete_image(image_url)
+                    for index in indexes:
+                        results[index]["error"] = str(e)
+                    continue
+
+                for index, item in zip(indexes, items):
+                    results[index] = {
+                        "filename": results[index]["filename"],
+                        "success": True,
+                        "item": {
+                            "id": str(item["id"]),
+                            "image_url": item["image_url"],
+                            "categoryGroup": item["category_group"],
+                            "category": item["category"],
+                            "attributes": item["attributes"]
+                        }
+                    }
+
+        return results
+
+    @staticmethod
+    def _persist_chunk(user_id: UUID, image_urls: List[str], tags_list: List[dict]) -> List[dict]:
+        """
+        Write a chunk's items to Postgres, Qdrant and wardrobe_tags. If a write
+        fails, the earlier ones are undone before re-raising, so no item is left
+        without its embedding or tags.
+        """
+        items = WardrobeRepository.bulk_create(user_id, [
+            {
+                "id": str(uuid.uuid4()),
+                "image_url": image_url,
+                "category_group": tags["categoryGroup"],
+                "category": tags["category"],
+                "attributes": tags["attributes"]
+            }
+            for image_url, tags in zip(image_urls, tags_list)
+        ])
+        item_ids = [str(item["id"]) for item in items]
+
+        try:
+            store_embeddings([
+                {
+                    "item_id": str(item["id"]),
+                    "user_id": str(user_id),
+                    "embedding": tags["embedding"],
+                    "category_group": item["category_group"],
+                    "category": item["category"],
+                    "attributes": item["attributes"],
+                    "image_url": item["image_url"]
+                }
+                for item, tags in zip(items, tags_list)
+            ])
+        except Exception:
+            WardrobeUploadService._undo(lambda: WardrobeRepository.bulk_delete(item_ids, user_id))
+            raise
+
+        try:
+            WardrobeTagsService.add_items_to_tags(user_id, [
+                {"category_group": item["category_group"], "category": item["category"], "item_id": str(item["id"])}
+                for item in items
+            ])
+        except Exception:
+            WardrobeUploadService._undo(lambda: delete_embeddings(item_ids))
+            WardrobeUploadService._undo(lambda: WardrobeRepository.bulk_delete(item_ids, user_id))
+            raise
+
+        return items
+
+    @staticmethod
+    def _undo(operation):
+        """Run a compensating write, logging rather than masking the original error."""
+        try:
+            operation()
+        except Exception as e:
+            print(f"Failed to roll back batch upload write: {e}")
+
+    @staticmethod
+    def _prepare_image(file):
+        """Background removal and MinIO upload for one file of a batch."""
+        processed_image = remove_background_image(file)
+        return processed_image, upload_image(encode_png(processed_image))
+
+    @staticmethod
+    def _run_stages(job_id: str, user_id: UUID, path: str) -> dict:
+        # A re-queued job may have saved its item before being interrupted;
+        # finish it from the saved row instead of processing the upload again
+        item = WardrobeRepository.get_by_id(job_id)
+        if item is not None:
+            return WardrobeUploadService._finish_saved_item(job_id, user_id, item)
+
+        with _stage(job_id, "remove_background"):
+            # Remove background and add white background
+            with open(path, "rb") as f:
+                processed_image = remove_background_image(f)
+
+        with _stage(job_id, "upload_image"):
+            image_url = upload_image(encode_png(processed_image))
+
+        try:
+            with _stage(job_id, "generate_tags"):
+                # Jobs may be queued before CLIP has finished loading
+                wait_until_ready(timeout=UPLOAD_CLIP_WAIT_TIMEOUT)
+                tags = generate_tags(processed_image)
+
+            with _stage(job_id, "save_item"):
+                item = WardrobeRepository.create(
+                    user_id=user_id,
+                    image_url=image_url,
+                    category_group=tags["categoryGroup"],
+                    category=tags["category"],
+                    attributes=tags["attributes"],
+                    item_id=job_id
+                )
+        except Exception:
+            # No item references the uploaded image
+            delete_image(image_url)
+            raise
+
+        return WardrobeUploadService._index_item(job_id, user_id, item, tags["embedding"])
+
+    @staticmethod
+    def _finish_saved_item(job_id: str, user_id: UUID, item: dict) -> dict:
+        """Run the stages after save_item for an item saved by an earlier attempt."""
+        for stage in ("remove_background", "upload_image", "save_item"):
+            UploadJobRepository.update_stage(job_id, stage, {"status": "skipped"})
+
+        with _stage(job_id, "generate_tags"):
+            # Only the embedding is needed; tags come from the saved row
+            wait_until_ready(timeout=UPLOAD_CLIP_WAIT_TIMEOUT)
+            embedding = generate_tags(item["image_url"])["embedding"]
+
+        return WardrobeUploadService._index_item(job_id, user_id, item, embedding)
+
+    @staticmethod
+    def _index_item(job_id: str, user_id: UUID, item: dict, embedding: list) -> dict:
+        with _stage(job_id, "update_tags"):
+            WardrobeTagsService.add_item_to_tag(
+                user_id=user_id,
+                category_group=item["category_group"],
+                category=item["category"],
+                item_id=str(item["id"])
+            )
+
+        with _stage(job_id, "store_embedding"):
+            store_embedding(
+                item_id=str(item["id"]),
+                user_id=str(user_id),
+                embedding=embedding,
+                category_group=item["category_group"],
+                category=item["category"],
+                attributes=item["attributes"],
+                image_url=item["image_url"]
+            )
+
+        return {
+            "id": str(item["id"]),
+            "image_url": item["image_url"],
+            "categoryGroup": item["category_group"],
+            "category": item["category"],
+            "attributes": item["attributes"]
+        }